@@ -0,0 +1,120 @@
+"""
+Пакет спрайтов: готовые пиксели в одном файле, читаемом через mmap
+
+Спрайты сохраняются уже масштабированными до игрового размера в виде
+сырых RGBA. При запуске файл отображается в память, и поверхности
+строятся прямо поверх отображенных байтов - без декодирования PNG и
+масштабирования. Несколько процессов игры делят одни и те же страницы.
+
+Сборка пакета (после изменения картинок):
+    python asset_pack.py
+"""
+
+import mmap
+import os
+import struct
+import pygame
+
+PACK_PATH = 'assets/sprites.pack'
+
+# Заголовок: сигнатура, версия, количество спрайтов. Далее оглавление:
+# имя, mtime исходника, ширина, высота, смещение пикселей от начала файла
+MAGIC = b"CDSP"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+ENTRY = struct.Struct("<32sqHHQ")
+# Выравнивание пикселей каждого спрайта в файле
+ALIGN = 64
+
+
+def write_pack(path, sprites):
+    """Запись пакета; sprites - список (имя, mtime исходника, Surface)"""
+    offset = HEADER.size + ENTRY.size * len(sprites)
+    index = []
+    pixels = []
+    for name, mtime, surface in sprites:
+        offset += -offset % ALIGN
+        data = pygame.image.tobytes(surface, "RGBA")
+        width, height = surface.get_size()
+        index.append(ENTRY.pack(name.encode("utf-8"), mtime, width, height, offset))
+        pixels.append((offset, data))
+        offset += len(data)
+
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sprites)))
+        f.write(b"".join(index))
+        for start, data in pixels:
+            f.write(bytes(start - f.tell()))
+            f.write(data)
+    os.replace(temp, path)
+
+
+class AssetPack:
+    """Пакет спрайтов, отображенный в память только для чтения"""
+    def __init__(self, path=PACK_PATH):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        if len(self.map) < HEADER.size:
+            raise ValueError("Пакет спрайтов поврежден")
+        magic, version, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Неизвестный формат пакета спрайтов")
+        if HEADER.size + count * ENTRY.size > len(self.map):
+            raise ValueError("Пакет спрайтов поврежден")
+
+        # Имя -> (mtime исходника, ширина, высота, смещение)
+        self.entries = {}
+        for i in range(count):
+            name, mtime, width, height, offset = ENTRY.unpack_from(
+                self.map, HEADER.size + i * ENTRY.size)
+            if offset + width * height * 4 > len(self.map):
+                raise ValueError("Пакет спрайтов поврежден")
+            self.entries[name.rstrip(b"\0").decode("utf-8")] = (mtime, width, height, offset)
+
+    def is_fresh(self, name, path):
+        """Совпадает ли спрайт в пакете с файлом-исходником"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        try:
+            return os.stat(path).st_mtime_ns == entry[0]
+        except OSError:
+            # Исходника нет - используем то, что было собрано
+            return True
+
+    def surface(self, name):
+        """Поверхность поверх отображенных байтов (без копирования)"""
+        mtime, width, height, offset = self.entries[name]
+        data = self.view[offset:offset + width * height * 4]
+        return pygame.image.frombuffer(data, (width, height), "RGBA")
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def main():
+    """Сборка пакета из картинок SPRITE_PATHS"""
+    from sprites import SPRITE_PATHS, decode_sprite, sprite_size
+
+    sprites = []
+    for name, path in SPRITE_PATHS.items():
+        if not os.path.exists(path):
+            print(f"⚠ Файл не найден: {path}, пропускаю")
+            continue
+        surface = decode_sprite(path, sprite_size(name))
+        sprites.append((name, os.stat(path).st_mtime_ns, surface))
+        print(f"✓ {name}: {surface.get_width()}x{surface.get_height()}")
+
+    os.makedirs(os.path.dirname(PACK_PATH), exist_ok=True)
+    write_pack(PACK_PATH, sprites)
+    print(f"✅ Пакет записан: {PACK_PATH} ({len(sprites)} спрайтов)")
+
+
+if __name__ == "__main__":
+    main()
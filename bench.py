@@ -0,0 +1,302 @@
+"""
+Набор замеров производительности (без окна)
+
+Запуск всех замеров и сохранение результатов как базы:
+    python bench.py --save benchmarks/base.json
+Сравнение с базой (код выхода 1 при регрессии больше порога, %):
+    python bench.py --compare benchmarks/base.json [--threshold 10]
+Сравнение двух сохраненных результатов без запуска:
+    python bench.py --compare base.json --against new.json
+Только замеры, в имени которых есть подстрока:
+    python bench.py --only frame
+"""
+
+from cli import headless, option
+
+headless()
+
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pygame
+
+# Повторы замера и минимальная длительность одного повтора, с
+REPEATS = 5
+MIN_TIME = 0.2
+THRESHOLD = 10.0
+
+
+def quiet():
+    """Подавление вывода игры во время подготовки и замеров"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def scaled_level(platforms, enemies, width, seed=0):
+    """Файл сгенерированного уровня (levelgen) с заданным числом платформ и врагов"""
+    from levelgen import write_level
+    path = os.path.join(tempfile.gettempdir(),
+                        f"bench-p{platforms}-e{enemies}-w{width}-s{seed}.json")
+    boss = enemies // 50
+    flying = (enemies - boss) * 2 // 5
+    write_level(path, seed=seed, platforms=platforms, ground=enemies - boss - flying,
+                flying=flying, boss=boss, width=width)
+    return path
+
+
+def screen_level(platforms, seed=0):
+    """Файл уровня шириной в экран со случайными платформами
+
+    Платформы могут пересекаться - уровень нужен только для замера отрисовки.
+    """
+    rng = random.Random(seed)
+    items = [[0, 550, 800, 50]] + [
+        [rng.randrange(0, 740), rng.randrange(150, 500), rng.randrange(60, 201), 20]
+        for _ in range(platforms - 1)]
+    path = os.path.join(tempfile.gettempdir(), f"bench-screen-p{platforms}-s{seed}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"name": "bench", "objective": "", "player_start": [50, 300],
+                   "width": 800, "platforms": items, "enemies": []}, f)
+    return path
+
+
+def new_game(level=1, path=None, **options):
+    """Игра без окна на уровне level (или из файла path) в режиме игры"""
+    from game import Game
+    from sprites import LOAD_SYNC
+    with quiet():
+        game = Game(headless=True, sprite_loading=LOAD_SYNC, **options)
+        game.load_level(level, path)
+    game.lives = 10 ** 9
+    return game
+
+
+def input_script(seed, length=600):
+    """Воспроизводимая последовательность масок клавиш"""
+    from inputs import LEFT, RIGHT, SPACE, Z
+    rng = random.Random(seed)
+    choices = (RIGHT, RIGHT | Z, LEFT, LEFT | SPACE, RIGHT | SPACE | Z, Z, 0)
+    return [rng.choice(choices) for _ in range(length)]
+
+
+# Замеры: функция подготовки возвращает функцию одного прохода
+
+def bench_player_update(platforms):
+    from game import Player
+    from inputs import KeyState, RIGHT
+    from spatial import PlatformGrid
+    rng = random.Random(1)
+    width = 200 * platforms
+    items = [(0, 550, width, 50)] + [
+        (rng.randrange(0, width), rng.randrange(150, 500), rng.randrange(60, 200), 20)
+        for _ in range(platforms - 1)]
+    grid = PlatformGrid(items)
+    player = Player(50, 300)
+    keys = KeyState(RIGHT)
+
+    def run():
+        player.update(keys, grid, width, (0, width))
+        if player.x > width - 100:
+            player.x = 50
+    return run
+
+
+def bench_check_collisions(enemies, projectiles):
+    game = new_game()
+    path = scaled_level(1, enemies, 800 + 40 * enemies, seed=2)
+    with quiet():
+        game.load_level(1, path)
+    # Снаряды летят над врагами и не попадают - проверяется только поиск
+    pool = game.player.projectiles
+    pool.update = lambda left, right: None
+    for i in range(projectiles):
+        pool.spawn(40 * i % 4000, 20 + i % 10, 20, 10, 0)
+    game.player.x, game.player.y = 10, 0
+
+    def run():
+        game.check_collisions()
+    return run
+
+
+def bench_draw_platforms(platforms, cold):
+    game = new_game(path=screen_level(platforms, seed=3))
+    level = game.level
+    screen = game.screen
+
+    def run():
+        if cold:
+            level.chunks.clear()
+        level.draw_platforms(screen)
+    return run
+
+
+def bench_draw_ui():
+    game = new_game()
+
+    def run():
+        game.draw_ui()
+    return run
+
+
+def bench_sprite_load():
+    from sprites import SpriteManager, LOAD_SYNC
+
+    def run():
+        with quiet():
+            SpriteManager().load_sprites(LOAD_SYNC)
+    return run
+
+
+def bench_frame(level=1, path=None, **options):
+    game = new_game(level, path, **options)
+    script = input_script(level)
+    state = {"tick": 0}
+    # Конец уровня откатывается к стартовому снимку без перестройки уровня
+    start = game.snapshot()
+
+    def run():
+        tick = state["tick"]
+        state["tick"] = tick + 1
+        with quiet():
+            game.tick(script[tick % len(script)])
+            if game.game_state != "playing":
+                game.restore(start)
+            game.draw(0.5)
+    return run
+
+
+def benchmarks():
+    """Имя замера -> функция подготовки"""
+    cases = {
+        "player_update/platforms=10": lambda: bench_player_update(10),
+        "player_update/platforms=1000": lambda: bench_player_update(1000),
+        "check_collisions/enemies=10,projectiles=10": lambda: bench_check_collisions(10, 10),
+        "check_collisions/enemies=1000,projectiles=100": lambda: bench_check_collisions(1000, 100),
+        "draw_platforms/platforms=7": lambda: bench_draw_platforms(7, False),
+        "draw_platforms/platforms=500": lambda: bench_draw_platforms(500, False),
+        "draw_platforms/platforms=500,cold": lambda: bench_draw_platforms(500, True),
+        "draw_ui": bench_draw_ui,
+        "sprite_load": bench_sprite_load,
+    }
+    for level in (1, 2, 3):
+        cases[f"frame/level{level}"] = lambda level=level: bench_frame(level)
+    cases["frame/level1,dirty"] = lambda: bench_frame(1, dirty_rects=True)
+    cases["frame/scaled,platforms=500,enemies=1000"] = lambda: bench_frame(
+        path=scaled_level(500, 1000, 40000, seed=4))
+    cases["frame/scaled,platforms=2000,enemies=5000"] = lambda: bench_frame(
+        path=scaled_level(2000, 5000, 160000, seed=5))
+    cases["frame/scaled,platforms=500,enemies=1000,dirty"] = lambda: bench_frame(
+        path=scaled_level(500, 1000, 40000, seed=4), dirty_rects=True)
+    return cases
+
+
+def measure(run):
+    """Время одного прохода в микросекундах: min/median по повторам
+
+    Число проходов в повторе подбирается так, чтобы повтор занимал
+    не меньше MIN_TIME. Сборщик мусора на время замера выключен.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME / 4:
+            break
+        number *= 2
+    number = max(1, int(number * MIN_TIME / max(elapsed, 1e-9)))
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            times.append((time.perf_counter() - start) / number * 1e6)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"min_us": min(times), "median_us": float(np.median(times)), "number": number}
+
+
+def run_all(only=None):
+    """Запуск замеров, результат в формате файла базы"""
+    pygame.init()
+    results = {}
+    for name, setup in benchmarks().items():
+        if only and only not in name:
+            continue
+        results[name] = measure(setup())
+        print(f"{name:<48}{results[name]['min_us']:12.2f} мкс")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(base, new, threshold=THRESHOLD):
+    """Сравнение результатов по min_us; возвращает имена регрессий"""
+    regressions = []
+    print(f"{'замер':<48}{'база':>12}{'сейчас':>12}{'изм.':>9}")
+    for name, result in new["results"].items():
+        old = base["results"].get(name)
+        if old is None:
+            print(f"{name:<48}{'-':>12}{result['min_us']:12.2f}")
+            continue
+        change = (result["min_us"] / old["min_us"] - 1) * 100
+        mark = ""
+        if change > threshold:
+            regressions.append(name)
+            mark = "  ❌ регрессия"
+        print(f"{name:<48}{old['min_us']:12.2f}{result['min_us']:12.2f}{change:+8.1f}%{mark}")
+    if base["meta"] != new["meta"]:
+        print("⚠ База снята в другом окружении - сравнение приблизительное")
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    threshold = float(option(args, "--threshold")) if "--threshold" in args else THRESHOLD
+
+    if "--against" in args:
+        with open(option(args, "--against"), encoding="utf-8") as f:
+            new = json.load(f)
+    else:
+        new = run_all(option(args, "--only") if "--only" in args else None)
+
+    if "--save" in args:
+        path = option(args, "--save")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(new, f, indent=2, ensure_ascii=False)
+        print(f"✅ Результаты записаны: {path}")
+
+    if "--compare" in args:
+        with open(option(args, "--compare"), encoding="utf-8") as f:
+            base = json.load(f)
+        regressions = compare(base, new, threshold)
+        if regressions:
+            print(f"❌ Регрессий больше {threshold:g}%: {len(regressions)}")
+            sys.exit(1)
+        print("✅ Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Общее для утилит командной строки: main, bench, levelgen, simrun, env
+
+Разбор параметров вида "--имя значение" и настройка SDL для работы
+без окна и звука.
+"""
+
+import os
+
+
+def headless():
+    """Драйверы SDL без окна и звука; вызывать до импорта pygame"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # Иначе SDL перехватывает SIGTERM и пул процессов не может остановить исполнителей
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+
+def option(args, name):
+    """Значение параметра командной строки после name"""
+    index = args.index(name) + 1
+    return args[index] if index < len(args) and not args[index].startswith("--") else None
+
+
+def options(args, name):
+    """Все значения повторяющегося параметра"""
+    return [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == name]
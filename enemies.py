@@ -0,0 +1,138 @@
+"""
+Пакетная симуляция врагов на массивах NumPy
+"""
+
+import numpy as np
+
+from spatial import SortedBoxes
+
+# Коды типов врагов в массиве kind
+GROUND = 0
+FLYING = 1
+BOSS = 2
+TYPE_CODES = {"ground": GROUND, "flying": FLYING, "boss": BOSS}
+
+
+def enemy_field(name, array):
+    """Атрибут Enemy, который после привязки хранится в массиве системы
+
+    До привязки значение лежит в слоте "_" + name.
+    """
+    slot = "_" + name
+
+    def get(self):
+        system = self.system
+        if system is None:
+            return getattr(self, slot)
+        return getattr(system, array)[self.index].item()
+
+    def set(self, value):
+        system = self.system
+        if system is None:
+            setattr(self, slot, value)
+        else:
+            getattr(system, array)[self.index] = value
+
+    return property(get, set)
+
+
+class EnemySystem:
+    """Все враги уровня в виде структуры массивов
+
+    Объекты Enemy после привязки становятся представлениями строки
+    массивов: чтение и запись их атрибутов идут в массивы системы.
+    update() обновляет всех врагов несколькими векторными проходами.
+    Скорости врагов заданы на тик частоты 60 тиков/с; step - длина тика
+    симуляции в таких тиках.
+    """
+    def __init__(self, enemies, step=1.0):
+        self.enemies = list(enemies)
+        self.step = step
+        self.x = np.array([enemy.x for enemy in self.enemies], dtype=np.float64)
+        self.y = np.array([enemy.y for enemy in self.enemies], dtype=np.float64)
+        self.speed = np.array([enemy.speed for enemy in self.enemies], dtype=np.float64) * step
+        self.direction = np.array([enemy.direction for enemy in self.enemies], dtype=np.int64)
+        self.alive = np.array([enemy.is_alive for enemy in self.enemies], dtype=bool)
+        self.timer = np.array([enemy.animation_timer for enemy in self.enemies], dtype=np.int64)
+        self.width = np.array([enemy.width for enemy in self.enemies], dtype=np.int64)
+        self.height = np.array([enemy.height for enemy in self.enemies], dtype=np.int64)
+        self.max_width = int(self.width.max()) if len(self.enemies) else 0
+        self.kind = np.array([TYPE_CODES[enemy.type] for enemy in self.enemies], dtype=np.int8)
+        # Позиции на прошлом тике - для интерполяции при отрисовке
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        # Спящие враги (далеко от камеры) не обновляются
+        self.awake = np.ones(len(self.enemies), dtype=bool)
+        # Порядок врагов по левому краю с прошлого кадра (broadphase)
+        self.order = None
+
+        for index, enemy in enumerate(self.enemies):
+            enemy.bind(self, index)
+
+    def wake(self, left, right):
+        """Пробуждение врагов в полосе мира [left, right], остальные засыпают"""
+        np.logical_and(self.x + self.width >= left, self.x <= right, out=self.awake)
+
+    def update(self, player_x, world_width, world_height):
+        """Обновление всех живых неспящих врагов"""
+        np.copyto(self.prev_x, self.x)
+        np.copyto(self.prev_y, self.y)
+        alive = self.alive & self.awake
+        if not alive.any():
+            return
+        x = self.x
+        kind = self.kind
+        self.timer += alive
+
+        # Наземные и летающие ходят туда-сюда
+        patrol = alive & (kind != BOSS)
+        x[patrol] += (self.speed * self.direction)[patrol]
+
+        # Летающие летают волнообразно
+        flying = alive & (kind == FLYING)
+        if flying.any():
+            step = self.step
+            self.y[flying] += np.sin(self.timer[flying] / (30 / step)) * (2 * step)
+
+        bounce = patrol & ((x <= 0) | (x + self.width >= world_width))
+        self.direction[bounce] *= -1
+
+        # Босс следует за игроком в пределах мира
+        boss = alive & (kind == BOSS)
+        if boss.any():
+            bx = x[boss]
+            speed = self.speed[boss]
+            bx += np.where(player_x > bx, speed, -speed)
+            x[boss] = np.maximum(0, np.minimum(world_width - self.width[boss], bx))
+            self.y[boss] = np.maximum(50, np.minimum(world_height - 150, self.y[boss]))
+
+    def position(self, index, alpha=1.0):
+        """Позиция врага между прошлым и текущим тиком"""
+        x = self.x[index].item()
+        y = self.y[index].item()
+        if alpha == 1.0:
+            return x, y
+        prev_x = self.prev_x[index].item()
+        prev_y = self.prev_y[index].item()
+        return prev_x + (x - prev_x) * alpha, prev_y + (y - prev_y) * alpha
+
+    def visible(self, left, right):
+        """Индексы живых врагов, попадающих в полосу мира [left, right)"""
+        return np.flatnonzero(self.alive & (self.x + self.width > left) & (self.x < right)).tolist()
+
+    def broadphase(self):
+        """Индекс sweep and prune по прямоугольникам всех врагов (и мертвых)
+
+        Координаты округляются как в pygame.Rect.
+        """
+        index = SortedBoxes(np.trunc(self.x), np.trunc(self.y), self.width, self.height,
+                            self.max_width, self.order)
+        self.order = index.order
+        return index
+
+    def any_alive(self):
+        """Остался ли хоть один живой враг"""
+        return bool(self.alive.any())
+
+    def __len__(self):
+        return len(self.enemies)
@@ -0,0 +1,405 @@
+"""
+Среда для обучения агентов в стиле Gym: reset() и step()
+
+GameEnv - одна игра без окна. Действие - номер набора клавиш из ACTIONS,
+зажатых на тик. Эпизод - прохождение одного уровня: он завершается
+прохождением уровня или концом игры, обрывается по max_steps.
+
+Наблюдение obs="state" - вектор float32 (игрок, ближайшие враги,
+ближайшие снаряды), obs="pixels" - кадр pygame.surfarray.pixels3d
+(ширина, высота, 3): представление поверхности кадра без копирования.
+Пока представление живо, поверхность заблокирована и рисовать в нее
+нельзя, поэтому кадры чередуются между двумя поверхностями, а если
+обе заняты (кадры сохранены агентом), берется новая.
+
+VectorEnv - N игр, которые шагают в ногу: в одном процессе или на
+процессах-исполнителях; наблюдения исполнители пишут в общую память.
+
+    python env.py [--envs N] [--workers N] [--obs state|pixels] [--steps N]
+"""
+
+from cli import headless, option
+
+headless()
+
+import contextlib
+import io
+import multiprocessing
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+from enemies import TYPE_CODES
+from game import Game, SCREEN_WIDTH, SCREEN_HEIGHT
+from inputs import LEFT, RIGHT, SPACE, Z
+from sprites import LOAD_LAZY
+
+try:
+    from gymnasium import spaces
+except ImportError:
+    spaces = None
+
+# Дискретные действия: маски клавиш на тик
+ACTIONS = (0, LEFT, RIGHT, SPACE, LEFT | SPACE, RIGHT | SPACE,
+           Z, LEFT | Z, RIGHT | Z, SPACE | Z, LEFT | SPACE | Z, RIGHT | SPACE | Z)
+
+# Вектор состояния: игрок, затем NEAREST_ENEMIES врагов и
+# NEAREST_PROJECTILES снарядов по близости к игроку (пустые - нули)
+PLAYER_FEATURES = 8
+ENEMY_FEATURES = 4 + len(TYPE_CODES)
+PROJECTILE_FEATURES = 4
+NEAREST_ENEMIES = 8
+NEAREST_PROJECTILES = 4
+STATE_SIZE = (PLAYER_FEATURES + NEAREST_ENEMIES * ENEMY_FEATURES
+              + NEAREST_PROJECTILES * PROJECTILE_FEATURES)
+PIXELS_SHAPE = (SCREEN_WIDTH, SCREEN_HEIGHT, 3)
+
+# Награда: очки / REWARD_SCALE (враг - 1), минус LIFE_PENALTY за жизнь
+REWARD_SCALE = 100
+LIFE_PENALTY = 5.0
+MAX_STEPS = 18000
+LIVES = 3
+
+
+def observation_spec(obs):
+    """Форма и тип наблюдения для obs="state" или obs="pixels" """
+    if obs == "state":
+        return (STATE_SIZE,), np.float32
+    if obs == "pixels":
+        return PIXELS_SHAPE, np.uint8
+    raise ValueError(f"Неизвестный тип наблюдения: {obs}")
+
+
+def nearest(x, y, cx, cy, count):
+    """Индексы не больше count точек, ближайших к (cx, cy), по возрастанию расстояния"""
+    distance = np.hypot(x - cx, y - cy)
+    if distance.size > count:
+        order = np.argpartition(distance, count)[:count]
+        return order[np.argsort(distance[order])]
+    return np.argsort(distance)
+
+
+class GameEnv:
+    """Одна игра как среда reset()/step()
+
+    level, path - уровень эпизода (номер или файл уровня);
+    frame_skip - сколько тиков повторяется действие за step();
+    noop_max - до скольких пустых тиков в начале эпизода (по зерну reset),
+    чтобы эпизоды начинались по-разному;
+    out - массив, куда пишутся наблюдения (строка наблюдений VectorEnv).
+    """
+    def __init__(self, level=1, path=None, obs="state", frame_skip=1,
+                 max_steps=MAX_STEPS, noop_max=0, out=None):
+        self.level = level
+        self.path = path
+        self.obs = obs
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.noop_max = noop_max
+        self.observation_shape, self.observation_dtype = observation_spec(obs)
+        self.rng = random.Random()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.game = Game(headless=True, render=False, sprite_loading=LOAD_LAZY)
+        # Свои поверхности кадра: экран у всех игр процесса один
+        self.surfaces = [None, None]
+        self.surface_index = 0
+        self.out = out
+        if out is None and obs == "state":
+            self.out = np.zeros(STATE_SIZE, dtype=np.float32)
+        self.steps = 0
+
+        if spaces is not None:
+            self.action_space = spaces.Discrete(len(ACTIONS))
+            if obs == "state":
+                self.observation_space = spaces.Box(-np.inf, np.inf, (STATE_SIZE,), np.float32)
+            else:
+                self.observation_space = spaces.Box(0, 255, PIXELS_SHAPE, np.uint8)
+
+    def reset(self, seed=None, options=None):
+        """Начало эпизода, возвращает (наблюдение, info)"""
+        if seed is not None:
+            self.rng.seed(seed)
+        game = self.game
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.score = 0
+            game.lives = LIVES
+            game.current_level = self.level
+            game.load_level(self.level, self.path)
+            game.prev_mask = 0
+            for _ in range(self.rng.randint(0, self.noop_max)):
+                game.tick(0)
+        self.steps = 0
+        return self.observe(), self.info()
+
+    def step(self, action):
+        """Шаг: (наблюдение, награда, terminated, truncated, info)"""
+        game = self.game
+        mask = ACTIONS[action]
+        score, lives = game.score, game.lives
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(self.frame_skip):
+                game.tick(mask)
+                if game.game_state != "playing":
+                    break
+        self.steps += 1
+        reward = (game.score - score) / REWARD_SCALE - (lives - game.lives) * LIFE_PENALTY
+        terminated = game.game_state != "playing"
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.observe(), reward, terminated, truncated, self.info()
+
+    def info(self):
+        """Сведения о шаге для info"""
+        game = self.game
+        return {"score": game.score, "lives": game.lives, "steps": self.steps,
+                "state": game.game_state}
+
+    def observe(self):
+        """Наблюдение текущего тика (массив перезаписывается следующим шагом)"""
+        if self.obs == "state":
+            return self.fill_state(self.out)
+        pixels = self.render_pixels()
+        if self.out is None:
+            return pixels
+        np.copyto(self.out, pixels)
+        return self.out
+
+    def render_pixels(self):
+        """Отрисовка кадра, возвращает pixels3d поверхности кадра"""
+        self.surface_index ^= 1
+        surface = self.surfaces[self.surface_index]
+        # Заблокирована - на нее еще смотрит кадр, выданный раньше
+        if surface is None or surface.get_locked():
+            surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.surfaces[self.surface_index] = surface
+        self.game.screen = surface
+        # Ленивая загрузка спрайтов сообщает о заглушках
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.game.draw()
+        return pygame.surfarray.pixels3d(surface)
+
+    def fill_state(self, out):
+        """Вектор состояния в out: координаты врагов и снарядов - от игрока"""
+        game = self.game
+        player = game.player
+        out.fill(0)
+        cx = player.x + player.width / 2
+        cy = player.y + player.height / 2
+        out[:PLAYER_FEATURES] = (
+            player.x / game.level.width, player.y / SCREEN_HEIGHT,
+            player.vx / player.speed, player.vy / player.jump_power,
+            player.on_ground, player.facing_right,
+            player.attack_cooldown / player.attack_ticks, game.lives / LIVES)
+
+        start = PLAYER_FEATURES
+        system = game.enemy_system
+        alive = np.flatnonzero(system.alive)
+        if alive.size:
+            x = system.x[alive] + system.width[alive] / 2
+            y = system.y[alive] + system.height[alive] / 2
+            order = nearest(x, y, cx, cy, NEAREST_ENEMIES)
+            rows = out[start:start + NEAREST_ENEMIES * ENEMY_FEATURES].reshape(
+                NEAREST_ENEMIES, ENEMY_FEATURES)[:order.size]
+            index = alive[order]
+            rows[:, 0] = 1
+            rows[:, 1] = (x[order] - cx) / SCREEN_WIDTH
+            rows[:, 2] = (y[order] - cy) / SCREEN_HEIGHT
+            rows[:, 3] = system.direction[index]
+            rows[np.arange(order.size), 4 + system.kind[index]] = 1
+
+        start += NEAREST_ENEMIES * ENEMY_FEATURES
+        pool = player.projectiles
+        live = pool.slots()
+        if live.size:
+            x = pool.x[live] + pool.width[live] / 2
+            y = pool.y[live] + pool.height[live] / 2
+            order = nearest(x, y, cx, cy, NEAREST_PROJECTILES)
+            rows = out[start:start + NEAREST_PROJECTILES * PROJECTILE_FEATURES].reshape(
+                NEAREST_PROJECTILES, PROJECTILE_FEATURES)[:order.size]
+            rows[:, 0] = 1
+            rows[:, 1] = (x[order] - cx) / SCREEN_WIDTH
+            rows[:, 2] = (y[order] - cy) / SCREEN_HEIGHT
+            rows[:, 3] = np.sign(pool.speed[live[order]])
+        return out
+
+
+class EnvGroup:
+    """Несколько сред, шагающих в ногу, с наблюдениями в строках общего массива
+
+    Закончившиеся эпизоды сразу начинаются заново; в info такой среды
+    лежит "final_info" - info последнего шага эпизода.
+    """
+    def __init__(self, observations, options, first):
+        self.envs = [GameEnv(out=row, **options) for row in observations]
+        # Номер первой среды группы среди всех сред - для зерен
+        self.first = first
+
+    def reset(self, seed=None):
+        infos = []
+        for i, env in enumerate(self.envs):
+            env.reset(None if seed is None else seed + self.first + i)
+            infos.append(env.info())
+        return infos
+
+    def step(self, actions):
+        n = len(self.envs)
+        rewards = np.zeros(n, dtype=np.float32)
+        terminated = np.zeros(n, dtype=bool)
+        truncated = np.zeros(n, dtype=bool)
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, rewards[i], terminated[i], truncated[i], info = env.step(actions[i])
+            if terminated[i] or truncated[i]:
+                env.reset()
+                info = dict(env.info(), final_info=info)
+            infos.append(info)
+        return rewards, terminated, truncated, infos
+
+
+def worker(pipe, name, shape, dtype, start, stop, options):
+    """Процесс-исполнитель: среды start..stop, наблюдения в общей памяти name"""
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        observations = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        group = EnvGroup(observations[start:stop], options, start)
+        pipe.send("ready")
+        while True:
+            command, data = pipe.recv()
+            if command == "step":
+                pipe.send(group.step(data))
+            elif command == "reset":
+                pipe.send(group.reset(data))
+            else:
+                break
+        # Представления общей памяти должны умереть раньше нее
+        del group, observations
+    except KeyboardInterrupt:
+        pass
+    finally:
+        memory.close()
+        pipe.close()
+
+
+class VectorEnv:
+    """num_envs сред, шагающих в ногу
+
+    workers=0 - все среды в этом процессе, иначе они делятся между
+    workers процессами. Наблюдения всех сред - один массив
+    (num_envs, *форма наблюдения); при workers > 0 он лежит в общей
+    памяти и исполнители пишут в него сами, по каналам передаются
+    только действия, награды и info.
+    """
+    def __init__(self, num_envs, workers=0, **options):
+        self.num_envs = num_envs
+        shape, dtype = observation_spec(options.get("obs", "state"))
+        shape = (num_envs,) + shape
+        self.memory = None
+        self.pipes = []
+        self.processes = []
+        if not workers:
+            self.observations = np.zeros(shape, dtype=dtype)
+            self.group = EnvGroup(self.observations, options, 0)
+            return
+
+        workers = min(workers, num_envs)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.observations = np.ndarray(shape, dtype=dtype, buffer=self.memory.buf)
+        self.bounds = [int(bound) for bound in np.linspace(0, num_envs, workers + 1)]
+        for start, stop in zip(self.bounds[:-1], self.bounds[1:]):
+            pipe, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=worker, args=(child, self.memory.name, shape, dtype,
+                                     start, stop, options), daemon=True)
+            process.start()
+            child.close()
+            self.pipes.append(pipe)
+            self.processes.append(process)
+        for pipe in self.pipes:
+            pipe.recv()
+
+    def reset(self, seed=None):
+        """Начало эпизодов всех сред: (наблюдения, список info)"""
+        if not self.pipes:
+            return self.observations, self.group.reset(seed)
+        for pipe in self.pipes:
+            pipe.send(("reset", seed))
+        infos = []
+        for pipe in self.pipes:
+            infos.extend(pipe.recv())
+        return self.observations, infos
+
+    def step(self, actions):
+        """Шаг всех сред: (наблюдения, награды, terminated, truncated, список info)
+
+        Массив наблюдений один и тот же, он перезаписывается каждым шагом.
+        """
+        if not self.pipes:
+            return (self.observations,) + self.group.step(actions)
+        for pipe, start, stop in zip(self.pipes, self.bounds[:-1], self.bounds[1:]):
+            pipe.send(("step", np.asarray(actions[start:stop])))
+        results = [pipe.recv() for pipe in self.pipes]
+        rewards = np.concatenate([result[0] for result in results])
+        terminated = np.concatenate([result[1] for result in results])
+        truncated = np.concatenate([result[2] for result in results])
+        infos = [info for result in results for info in result[3]]
+        return self.observations, rewards, terminated, truncated, infos
+
+    def close(self):
+        """Остановка исполнителей и освобождение общей памяти"""
+        for pipe in self.pipes:
+            try:
+                pipe.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self.pipes:
+            pipe.close()
+        self.pipes = []
+        self.processes = []
+        if self.memory is not None:
+            self.observations = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def main():
+    """Замер скорости: случайные действия во всех средах"""
+    args = sys.argv[1:]
+    num_envs = int(option(args, "--envs")) if "--envs" in args else 8
+    workers = int(option(args, "--workers")) if "--workers" in args else 0
+    obs = option(args, "--obs") if "--obs" in args else "state"
+    steps = int(option(args, "--steps")) if "--steps" in args else 1000
+
+    rng = np.random.default_rng(0)
+    with VectorEnv(num_envs, workers, obs=obs) as envs:
+        envs.reset(seed=0)
+        episodes = 0
+        start = time.perf_counter()
+        for _ in range(steps):
+            actions = rng.integers(len(ACTIONS), size=num_envs)
+            _, _, terminated, truncated, _ = envs.step(actions)
+            episodes += int(terminated.sum() + truncated.sum())
+        elapsed = time.perf_counter() - start
+    print(f"Сред: {num_envs}, исполнителей: {workers}, наблюдение: {obs}")
+    print(f"Шагов: {steps * num_envs}, эпизодов: {episodes}, время: {elapsed:.1f} с, "
+          f"скорость: {steps * num_envs / elapsed:.0f} шагов/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,48 @@
 Вся игра в одном файле с работающими платформами
 """
 
+import os
 import pygame
 import sys
 import math
-
-from sprites import sprite_manager
+import time
+from operator import attrgetter
+
+from sprites import sprite_manager, LOAD_BACKGROUND
+from spatial import PlatformGrid
+from ui import TextCache, HudText, OverlayScreen
+from render import RenderBatch
+from profiler import FrameProfiler
+from tracing import span
+from projectiles import ProjectilePool
+from enemies import EnemySystem, enemy_field
+from level_loader import level_count, level_path, load_level_data
+from snapshot import take_snapshot, restore_snapshot
+from inputs import (KeyState, LiveInput, Recording, ReplayInput,
+                    keys_to_mask, mask_to_keys)
 
 # Константы
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
 
+# Частота тиков симуляции по умолчанию. Скорости, гравитация и перезарядки
+# заданы на тик этой частоты; при другой частоте они пересчитываются
+TICK_RATE = 60
+# Защита от "спирали смерти": предел тиков на кадр и длительности кадра
+MAX_TICKS_PER_FRAME = 8
+MAX_FRAME_TIME = 0.25
+
+# Сколько кадров камера должна стоять, чтобы режим грязных
+# прямоугольников снова построил кэш фона
+STILL_FRAMES = 2
+
+# Ширина полосы (чанка) уровня: статичный слой рисуется, а враги
+# симулируются только в полосах рядом с камерой
+CHUNK_WIDTH = 400
+# Запас видимой области для интерполированных позиций врагов
+VIEW_MARGIN = 32
+
 # Цвета
 BACKGROUND = (26, 26, 46)        # Темно-синий
 PLAYER_CHIP = (249, 168, 38)     # Оранжевый
@@ -26,34 +57,64 @@ ENEMY_GROUND = (139, 69, 19)     # Коричневый
 ENEMY_FLYING = (255, 105, 180)   # Розовый
 ENEMY_BOSS = (255, 0, 0)         # Красный
 TEXT_COLOR = (255, 255, 255)
+COLORKEY = (255, 0, 255)         # Прозрачный цвет статичного слоя
+
+def player_coordinate(name):
+    """Координата игрока: значение в слоте "_" + name, целая часть - в rect"""
+    slot = "_" + name
+
+    def set_coordinate(player, value):
+        setattr(player, slot, value)
+        setattr(player.rect, name, int(value))
+    return property(attrgetter(slot), set_coordinate)
+
 
 class Player:
-    def __init__(self, start_x=50, start_y=300):
+    # rect обновляется при каждой записи x и y, объект Rect один на игрока
+    __slots__ = ("_x", "_y", "rect", "start_x", "start_y", "vx", "vy", "speed", "jump_power",
+                 "gravity", "friction", "shot_speed", "attack_ticks", "is_jumping", "character", "facing_right",
+                 "projectiles", "attack_cooldown", "on_ground", "prev_x", "prev_y")
+    width = 40
+    height = 60
+    x = player_coordinate("x")
+    y = player_coordinate("y")
+
+    def __init__(self, start_x=50, start_y=300, step=1.0):
+        """step - длина тика в тиках частоты TICK_RATE"""
+        # Прямоугольник для коллизий по текущей позиции
+        self.rect = pygame.Rect(start_x, start_y, self.width, self.height)
         self.x = start_x
         self.y = start_y
         self.start_x = start_x
         self.start_y = start_y
-        self.width = 40
-        self.height = 60
         self.vx = 0
         self.vy = 0
-        self.speed = 5
-        self.jump_power = 12
-        self.gravity = 0.5
-        self.friction = 0.8
+        # Скорости масштабируются на step, ускорение - на step^2
+        self.speed = 5 * step
+        self.jump_power = 12 * step
+        self.gravity = 0.5 * step * step
+        self.friction = 0.8 ** step
+        self.shot_speed = 8 * step
+        # Перезарядка атаки в тиках
+        self.attack_ticks = max(1, round(15 / step))
         self.is_jumping = False
         self.character = "Чип"
         self.facing_right = True
-        self.projectiles = []
+        self.projectiles = ProjectilePool()
         self.attack_cooldown = 0
-        # Добавляем rect для коллизий
-        self.rect = pygame.Rect(start_x, start_y, self.width, self.height)
         self.on_ground = False
+        # Позиция на прошлом тике - для интерполяции при отрисовке
+        self.prev_x = start_x
+        self.prev_y = start_y
+
+    def update(self, keys, platforms=None, world_width=SCREEN_WIDTH, view=(0, SCREEN_WIDTH)):
+        """Обновление состояния игрока
 
-    def update(self, keys, platforms=None):
-        """Обновление состояния игрока"""
-        # Сохраняем предыдущую позицию
-        prev_x, prev_y = self.x, self.y
+        world_width - ширина мира, view - видимая полоса мира (снаряды за
+        ее пределами исчезают)
+        """
+        # Сохраняем предыдущую позицию (чтение слотов в обход свойств x, y)
+        self.prev_x, self.prev_y = self._x, self._y
 
         # Движение
         if keys[pygame.K_LEFT]:
@@ -74,7 +135,7 @@ class Player:
         # Атака
         if keys[pygame.K_z] and self.attack_cooldown <= 0:
             self.shoot()
-            self.attack_cooldown = 15
+            self.attack_cooldown = self.attack_ticks
 
         if self.attack_cooldown > 0:
             self.attack_cooldown -= 1
@@ -83,101 +144,83 @@ class Player:
         self.vy += self.gravity
 
         # Сохраняем позицию до движения
-        old_x, old_y = self.x, self.y
+        old_x, old_y = self._x, self._y
 
         # Пробуем двигаться по X
-        self.x += self.vx
-        self.rect.x = int(self.x)
+        swept = self.rect.copy()
+        self.x = old_x + self.vx
 
         # Проверяем коллизии по X
         if platforms:
-            self.check_platform_collisions_x(platforms)
+            self.check_platform_collisions_x(platforms, swept.union(self.rect))
 
         # Пробуем двигаться по Y
-        self.y += self.vy
-        self.rect.y = int(self.y)
+        swept = self.rect.copy()
+        self.y = old_y + self.vy
 
         # Сбрасываем флаг земли
         self.on_ground = False
 
         # Проверяем коллизии по Y
         if platforms:
-            self.check_platform_collisions_y(platforms)
+            self.check_platform_collisions_y(platforms, swept.union(self.rect))
 
-        # Границы экрана по X
-        self.x = max(0, min(SCREEN_WIDTH - self.width, self.x))
-        self.rect.x = int(self.x)
+        # Границы мира по X
+        x = self._x
+        if x < 0 or x > world_width - self.width:
+            self.x = max(0, min(world_width - self.width, x))
 
         # Проверка на падение за экран
-        if self.y > SCREEN_HEIGHT:
+        if self._y > SCREEN_HEIGHT:
             self.respawn()
             return
 
         # Обновление снарядов
-        for proj in self.projectiles[:]:
-            proj['x'] += proj['speed']
-            if proj['x'] > SCREEN_WIDTH or proj['x'] + proj['width'] < 0:
-                self.projectiles.remove(proj)
-
-    def check_platform_collisions_x(self, platforms):
-        """Проверка горизонтальных столкновений с платформами"""
-        for platform in platforms:
-            x, y, width, height = platform
-            platform_rect = pygame.Rect(x, y, width, height)
-
-            if self.rect.colliderect(platform_rect):
+        self.projectiles.update(*view)
+
+    def check_platform_collisions_x(self, platforms, swept=None):
+        """Проверка горизонтальных столкновений с платформами
+
+        platforms - PlatformGrid уровня, swept - прямоугольник,
+        заметенный игроком за шаг (по умолчанию текущий rect)
+        """
+        rect = self.rect
+        for platform_rect in platforms.query(swept or rect):
+            if rect.colliderect(platform_rect):
+                x, width = platform_rect.x, platform_rect.width
                 # Если движемся вправо
                 if self.vx > 0:
                     self.x = x - self.width
-                    self.rect.x = int(self.x)
                     self.vx = 0
                 # Если движемся влево
                 elif self.vx < 0:
                     self.x = x + width
-                    self.rect.x = int(self.x)
                     self.vx = 0
 
-    def check_platform_collisions_y(self, platforms):
+    def check_platform_collisions_y(self, platforms, swept=None):
         """Проверка вертикальных столкновений с платформами"""
-        for platform in platforms:
-            x, y, width, height = platform
-            platform_rect = pygame.Rect(x, y, width, height)
-
-            if self.rect.colliderect(platform_rect):
+        rect = self.rect
+        for platform_rect in platforms.query(swept or rect):
+            if rect.colliderect(platform_rect):
+                y, height = platform_rect.y, platform_rect.height
                 # Если падаем вниз (стоим на платформе)
                 if self.vy > 0:
                     self.y = y - self.height
-                    self.rect.y = int(self.y)
                     self.vy = 0
                     self.is_jumping = False
                     self.on_ground = True
                 # Если движемся вверх (ударились головой)
                 elif self.vy < 0:
                     self.y = y + height
-                    self.rect.y = int(self.y)
                     self.vy = 0
 
     def shoot(self):
         """Выстрел снарядом"""
+        y = self.y + self.height // 2 - 5
         if self.facing_right:
-            projectile = {
-                'x': self.x + self.width,
-                'y': self.y + self.height // 2 - 5,
-                'width': 20,
-                'height': 10,
-                'speed': 8,
-                'rect': pygame.Rect(self.x + self.width, self.y + self.height // 2 - 5, 20, 10)
-            }
+            self.projectiles.spawn(self.x + self.width, y, 20, 10, self.shot_speed)
         else:
-            projectile = {
-                'x': self.x - 20,
-                'y': self.y + self.height // 2 - 5,
-                'width': 20,
-                'height': 10,
-                'speed': -8,
-                'rect': pygame.Rect(self.x - 20, self.y + self.height // 2 - 5, 20, 10)
-            }
-        self.projectiles.append(projectile)
+            self.projectiles.spawn(self.x - 20, y, 20, 10, -self.shot_speed)
 
     def switch_character(self):
         """Смена персонажа"""
@@ -187,103 +230,130 @@ class Player:
         """Возрождение на стартовой позиции"""
         self.x = self.start_x
         self.y = self.start_y
-        self.rect.x = int(self.x)
-        self.rect.y = int(self.y)
+        self.prev_x, self.prev_y = self.x, self.y
         self.vx = 0
         self.vy = 0
-        self.projectiles = []
+        self.projectiles.clear()
         self.is_jumping = False
         self.on_ground = False
         self.facing_right = True
 
-    def draw(self, screen):
-        """Отрисовка игрока со спрайтом"""
+    def draw(self, screen, alpha=1.0, offset_x=0, batch=None):
+        """Отрисовка игрока со спрайтом
+
+        alpha - доля пути от прошлого тика к текущему (интерполяция),
+        offset_x - сдвиг камеры, batch - RenderBatch для отложенного вывода.
+        Возвращает список прямоугольников экрана, которые были закрашены
+        (без команд, отложенных в batch)
+        """
+        x = self.prev_x + (self.x - self.prev_x) * alpha - offset_x
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+
         # Получаем спрайт
         sprite_name = 'chip' if self.character == 'Чип' else 'dale'
-        sprite = sprite_manager.get_sprite(sprite_name)
-
-        if sprite and sprite_manager.loaded:
-            # Если спрайт загружен
-            if not self.facing_right:
-                # Отражаем спрайт если смотрит влево
-                sprite = pygame.transform.flip(sprite, True, False)
+        # Отраженный вариант берется из атласа, если смотрит влево
+        region = sprite_manager.atlas_region(sprite_name, None, not self.facing_right)
 
+        if region and sprite_manager.loaded:
             # Рисуем спрайт
-            screen.blit(sprite, (self.x, self.y))
+            atlas, area = region
+            if batch is None:
+                drawn = [screen.blit(atlas, (x, y), area)]
+            else:
+                batch.blit("player", atlas, (x, y), area)
+                drawn = []
         else:
             # Fallback - цветной прямоугольник
             color = PLAYER_CHIP if self.character == "Чип" else PLAYER_DALE
 
             # Тело
-            pygame.draw.rect(screen, color,
-                             (self.x, self.y, self.width, self.height))
+            drawn = [pygame.draw.rect(screen, color,
+                                      (x, y, self.width, self.height))]
 
             # Глаза
-            eye_x = self.x + 25 if self.facing_right else self.x + 7
+            eye_x = x + 25 if self.facing_right else x + 7
             pygame.draw.rect(screen, WHITE,
-                             (eye_x, self.y + 15, 8, 8))
+                             (eye_x, y + 15, 8, 8))
             pygame.draw.rect(screen, BLACK,
-                             (eye_x + 2, self.y + 17, 4, 4))
+                             (eye_x + 2, y + 17, 4, 4))
 
             # Нос
-            nose_x = self.x + 20 if self.facing_right else self.x + 12
+            nose_x = x + 20 if self.facing_right else x + 12
             pygame.draw.rect(screen, BLACK,
-                             (nose_x, self.y + 25, 5, 5))
+                             (nose_x, y + 25, 5, 5))
 
         # Снаряды
-        for proj in self.projectiles:
-            projectile_color = (0, 255, 0)  # Зеленый
-            pygame.draw.rect(screen, projectile_color,
-                             (proj['x'], proj['y'], proj['width'], proj['height']))
+        projectile_color = (0, 255, 0)  # Зеленый
+        for proj in self.projectiles.rects(alpha, offset_x):
+            if batch is None:
+                drawn.append(pygame.draw.rect(screen, projectile_color, proj))
+            else:
+                batch.rect("projectiles", projectile_color, proj)
+
+        return drawn
 
 class Enemy:
+    # Состояние врага; после bind() хранится в массивах EnemySystem,
+    # до привязки - в слотах с подчеркиванием
+    __slots__ = ("system", "index", "_x", "_y", "_speed", "_direction",
+                 "_is_alive", "_animation_timer")
+    x = enemy_field("x", "x")
+    y = enemy_field("y", "y")
+    speed = enemy_field("speed", "speed")
+    direction = enemy_field("direction", "direction")
+    is_alive = enemy_field("is_alive", "alive")
+    animation_timer = enemy_field("animation_timer", "timer")
+
+    # Данные типа - атрибуты подкласса, общие для всех врагов типа:
+    # type, width, height, color, sprite и размеры глаз заглушки
+    eye_size = 8
+    pupil_size = 4
+
+    def __new__(cls, x, y, enemy_type="ground", speed=2):
+        # Enemy(x, y, тип) создает врага подкласса этого типа
+        if cls is Enemy:
+            cls = ENEMY_TYPES[enemy_type]
+        return object.__new__(cls)
+
     def __init__(self, x, y, enemy_type="ground", speed=2):
+        self.system = None
+        self.index = 0
         self.x = x
         self.y = y
-        self.type = enemy_type
-
-        if enemy_type == "boss":
-            self.width = 60
-            self.height = 60
-        else:
-            self.width = 40
-            self.height = 40
-
         self.speed = speed
         self.direction = 1
         self.is_alive = True
         self.animation_timer = 0
-        self.rect = pygame.Rect(x, y, self.width, self.height)  # Добавляем rect
 
-        # Цвета врагов
-        if enemy_type == "ground":
-            self.color = ENEMY_GROUND
-        elif enemy_type == "flying":
-            self.color = ENEMY_FLYING
-        else:
-            self.color = ENEMY_BOSS
+    def bind(self, system, index):
+        """Привязка к строке index массивов EnemySystem"""
+        self.system = system
+        self.index = index
+
+    @property
+    def rect(self):
+        """Прямоугольник для коллизий по текущей позиции"""
+        return pygame.Rect(int(self.x), int(self.y), self.width, self.height)
 
-    def update(self, player_x=400):
-        """Обновление врага"""
+    def update(self, player_x=400, world_width=SCREEN_WIDTH):
+        """Обновление одного врага (Game обновляет всех сразу через EnemySystem)"""
         if not self.is_alive:
             return
 
         self.animation_timer += 1
+        step = 1.0 if self.system is None else self.system.step
 
         if self.type == "ground":
             # Наземный враг ходит туда-сюда
             self.x += self.speed * self.direction
-            self.rect.x = int(self.x)
-            if self.x <= 0 or self.x + self.width >= SCREEN_WIDTH:
+            if self.x <= 0 or self.x + self.width >= world_width:
                 self.direction *= -1
 
         elif self.type == "flying":
             # Летающий враг летает волнообразно
             self.x += self.speed * self.direction
-            self.y += math.sin(self.animation_timer / 30) * 2
-            self.rect.x = int(self.x)
-            self.rect.y = int(self.y)
-            if self.x <= 0 or self.x + self.width >= SCREEN_WIDTH:
+            self.y += math.sin(self.animation_timer / (30 / step)) * (2 * step)
+            if self.x <= 0 or self.x + self.width >= world_width:
                 self.direction *= -1
 
         elif self.type == "boss":
@@ -294,161 +364,255 @@ class Enemy:
                 self.x -= self.speed
 
             # Ограничение движения босса
-            self.x = max(0, min(SCREEN_WIDTH - self.width, self.x))
+            self.x = max(0, min(world_width - self.width, self.x))
             self.y = max(50, min(SCREEN_HEIGHT - 150, self.y))
-            self.rect.x = int(self.x)
-            self.rect.y = int(self.y)
 
-    def draw(self, screen):
-        """Отрисовка врага со спрайтом"""
-        if not self.is_alive:
-            return
+    def draw(self, screen, alpha=1.0, offset_x=0, batch=None):
+        """Отрисовка врага со спрайтом
 
-        # Определяем имя спрайта
-        if self.type == "ground":
-            sprite_name = 'rat'
-        elif self.type == "flying":
-            sprite_name = 'bee'
-        else:  # boss
-            sprite_name = 'fatcat'
-
-        # Пытаемся получить спрайт
-        sprite = sprite_manager.get_sprite(sprite_name)
-
-        if sprite and sprite_manager.loaded:
-            # Масштабируем спрайт к размеру врага
-            sprite = pygame.transform.scale(sprite, (self.width, self.height))
+        alpha - доля пути от прошлого тика к текущему (интерполяция),
+        offset_x - сдвиг камеры, batch - RenderBatch для отложенного вывода.
+        Возвращает закрашенный прямоугольник экрана (None для мертвого врага
+        и для спрайта, отложенного в batch)
+        """
+        if not self.is_alive:
+            return None
 
-            # Рисуем спрайт
-            screen.blit(sprite, (self.x, self.y))
+        if self.system is None:
+            x, y = self.x, self.y
         else:
-            # Fallback - цветной прямоугольник
-            # Тело
-            pygame.draw.rect(screen, self.color,
-                             (self.x, self.y, self.width, self.height))
+            x, y = self.system.position(self.index, alpha)
+        x -= offset_x
 
-            # Глаза
-            eye_size = 8 if self.type != "boss" else 10
-            pupil_size = 4 if self.type != "boss" else 6
-
-            pygame.draw.rect(screen, WHITE,
-                             (self.x + 5, self.y + 10, eye_size, eye_size))
-            pygame.draw.rect(screen, WHITE,
-                             (self.x + self.width - eye_size - 5,
-                              self.y + 10, eye_size, eye_size))
+        # Пытаемся получить спрайт, масштабированный к размеру врага
+        width, height = self.width, self.height
+        region = sprite_manager.atlas_region(self.sprite, (width, height))
 
-            # Зрачки
-            pygame.draw.rect(screen, BLACK,
-                             (self.x + 7, self.y + 12, pupil_size, pupil_size))
-            pygame.draw.rect(screen, BLACK,
-                             (self.x + self.width - pupil_size - 7,
-                              self.y + 12, pupil_size, pupil_size))
+        if region and sprite_manager.loaded:
+            # Рисуем спрайт
+            atlas, area = region
+            if batch is None:
+                return screen.blit(atlas, (x, y), area)
+            batch.blit("enemies", atlas, (x, y), area)
+            return None
+
+        # Fallback - цветной прямоугольник
+        # Тело
+        drawn = pygame.draw.rect(screen, self.color, (x, y, width, height))
+
+        # Глаза
+        eye_size = self.eye_size
+        pupil_size = self.pupil_size
+
+        pygame.draw.rect(screen, WHITE,
+                         (x + 5, y + 10, eye_size, eye_size))
+        pygame.draw.rect(screen, WHITE,
+                         (x + width - eye_size - 5,
+                          y + 10, eye_size, eye_size))
+
+        # Зрачки
+        pygame.draw.rect(screen, BLACK,
+                         (x + 7, y + 12, pupil_size, pupil_size))
+        pygame.draw.rect(screen, BLACK,
+                         (x + width - pupil_size - 7,
+                          y + 12, pupil_size, pupil_size))
+        return drawn
 
     def get_rect(self):
         """Получение прямоугольника для коллизий"""
         return self.rect
 
-class Level:
-    def __init__(self, number):
-        self.number = number
-        self.platforms = []
-        self.enemies = []
-        self.player_start = (50, 300)
-        self.objective = ""
-
-        if number == 1:
-            self.load_level1()
-        elif number == 2:
-            self.load_level2()
-        elif number == 3:
-            self.load_level3()
-
-    def load_level1(self):
-        """Лесной уровень"""
-        self.platforms = [
-            (0, 500, 800, 100),   # Земля (нижняя платформа)
-            (100, 400, 150, 20),  # Платформа 1
-            (350, 350, 150, 20),  # Платформа 2
-            (550, 300, 150, 20)   # Платформа 3
-        ]
-
-        # Враги стоят на платформах
-        self.enemies = [
-            Enemy(120, 340, "ground", 2),  # На нижней платформе
-            Enemy(470, 290, "ground", 2),  # На средней платформе
-            Enemy(600, 240, "flying", 3)   # Летающий
-        ]
-
-        self.player_start = (50, 440)  # Старт на земле
-        self.objective = "Победите 3 врагов!"
-
-    def load_level2(self):
-        """Городской уровень"""
-        self.platforms = [
-            (0, 500, 800, 100),   # Земля
-            (50, 400, 120, 20),   # Платформа 1
-            (200, 350, 120, 20),  # Платформа 2
-            (380, 300, 120, 20),  # Платформа 3
-            (560, 250, 120, 20),  # Платформа 4
-            (700, 200, 100, 20)   # Платформа 5
-        ]
+class GroundEnemy(Enemy):
+    __slots__ = ()
+    type = "ground"
+    width = height = 40
+    color = ENEMY_GROUND
+    sprite = "rat"
 
-        self.enemies = [
-            Enemy(80, 380, "ground", 3),   # На платформе 1
-            Enemy(230, 330, "ground", 3),  # На платформе 2
-            Enemy(410, 250, "flying", 4),  # Летающий
-            Enemy(590, 200, "flying", 4)   # Летающий
-        ]
-
-        self.player_start = (50, 440)  # Старт на земле
-        self.objective = "Победите 4 врагов!"
-
-    def load_level3(self):
-        """Лабиринт Котомрыска"""
-        self.platforms = [
-            (0, 500, 800, 100),   # Земля
-            (100, 400, 100, 20),  # Платформа 1
-            (220, 350, 100, 20),  # Платформа 2
-            (340, 300, 100, 20),  # Платформа 3
-            (460, 250, 100, 20),  # Платформа 4
-            (580, 200, 100, 20),  # Платформа 5
-            (700, 150, 100, 20)   # Платформа 6
-        ]
 
-        self.enemies = [
-            Enemy(120, 380, "ground", 4),   # На платформе 1
-            Enemy(240, 330, "ground", 4),   # На платформе 2
-            Enemy(360, 250, "flying", 5),   # Летающий
-            Enemy(480, 200, "flying", 5),   # Летающий
-            Enemy(720, 90, "boss", 2)       # Босс на верхней платформе
-        ]
+class FlyingEnemy(Enemy):
+    __slots__ = ()
+    type = "flying"
+    width = height = 40
+    color = ENEMY_FLYING
+    sprite = "bee"
 
-        self.player_start = (50, 440)  # Старт на земле
-        self.objective = "Победите босса Котомрыска!"
 
-    def draw_platforms(self, screen):
-        """Отрисовка платформ уровня"""
-        for platform in self.platforms:
-            x, y, width, height = platform
+class BossEnemy(Enemy):
+    __slots__ = ()
+    type = "boss"
+    width = height = 60
+    color = ENEMY_BOSS
+    sprite = "fatcat"
+    eye_size = 10
+    pupil_size = 6
 
-            # Основная часть платформы
-            pygame.draw.rect(screen, PLATFORM_MAIN,
-                            (x, y, width, height))
 
-            # Верхняя грань (для лучшей видимости)
-            pygame.draw.rect(screen, PLATFORM_TOP,
-                            (x, y, width, 5))
+ENEMY_TYPES = {enemy.type: enemy for enemy in (GroundEnemy, FlyingEnemy, BossEnemy)}
 
-            # Текстура платформы (точки)
-            for i in range(x + 10, x + width - 10, 20):
-                pygame.draw.rect(screen, PLATFORM_TEXTURE,
-                                (i, y + 8, 6, 4))
+class Level:
+    def __init__(self, number, path=None):
+        self.number = number
+        self.path = path or level_path(number)
+
+        # Описание уровня из файла (или из его двоичного кэша)
+        data = load_level_data(self.path)
+        self.name = data.name
+        self.objective = data.objective
+        self.player_start = data.player_start
+        self.platforms = data.platform_tuples()
+        self.enemies = [Enemy(x, y, enemy_type, speed)
+                        for x, y, enemy_type, speed in data.enemy_specs()]
+
+        # Ширина мира: из файла, но не меньше экрана и крайней платформы
+        right = max((x + width for x, y, width, height in self.platforms), default=0)
+        self.width = max(SCREEN_WIDTH, data.width, right)
+
+        # Индекс платформ для коллизий строится один раз при загрузке
+        self.platform_grid = PlatformGrid(self.platforms)
+
+        # Статичный слой: заранее нарисованные полосы шириной CHUNK_WIDTH.
+        # Полосы рисуются, когда попадают в кадр, и выгружаются вдали
+        # от камеры; dirty_chunks - загруженные полосы, которые устарели
+        self.chunks = {}
+        self.dirty_chunks = set()
+
+    def chunk_count(self):
+        """Количество полос статичного слоя"""
+        return -(-self.width // CHUNK_WIDTH)
+
+    def add_platform(self, platform):
+        """Добавление платформы во время игры"""
+        platform = tuple(platform)
+        self.platforms.append(platform)
+        self.platform_grid.add(platform)
+        self.width = max(self.width, platform[0] + platform[2])
+        self.invalidate(pygame.Rect(platform))
+
+    def remove_platform(self, platform):
+        """Удаление платформы во время игры"""
+        platform = tuple(platform)
+        self.platforms.remove(platform)
+        self.platform_grid = PlatformGrid(self.platforms)
+        self.invalidate(pygame.Rect(platform))
+
+    def invalidate(self, rect):
+        """Пометка загруженных полос статичного слоя, которые задевает rect"""
+        first = max(0, rect.left // CHUNK_WIDTH)
+        last = (rect.right - 1) // CHUNK_WIDTH
+        self.dirty_chunks.update(index for index in range(first, last + 1)
+                                 if index in self.chunks)
+
+    def render_chunk(self, index):
+        """Отрисовка одной полосы статичного слоя"""
+        surface = self.chunks.get(index)
+        if surface is None:
+            surface = pygame.Surface((CHUNK_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface():
+                surface = surface.convert()
+            surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            self.chunks[index] = surface
+        surface.fill(COLORKEY)
+
+        offset_x = index * CHUNK_WIDTH
+        area = pygame.Rect(offset_x, 0, CHUNK_WIDTH, SCREEN_HEIGHT)
+        for rect in self.platform_grid.query(area):
+            self.draw_platform(surface, rect.move(-offset_x, 0))
+
+    def draw_platform(self, surface, rect):
+        """Отрисовка одной платформы"""
+        x, y, width, height = rect
+
+        # Основная часть платформы
+        pygame.draw.rect(surface, PLATFORM_MAIN,
+                        (x, y, width, height))
+
+        # Верхняя грань (для лучшей видимости)
+        pygame.draw.rect(surface, PLATFORM_TOP,
+                        (x, y, width, 5))
+
+        # Текстура платформы (точки)
+        for i in range(x + 10, x + width - 10, 20):
+            pygame.draw.rect(surface, PLATFORM_TEXTURE,
+                            (i, y + 8, 6, 4))
+
+    def draw_platforms(self, screen, offset_x=0):
+        """Отрисовка видимых полос статичного слоя со сдвигом камеры"""
+        first = max(0, offset_x // CHUNK_WIDTH)
+        last = min(self.chunk_count() - 1, (offset_x + SCREEN_WIDTH - 1) // CHUNK_WIDTH)
+
+        # Полосы дальше соседней с кадром выгружаются
+        for index in [i for i in self.chunks if i < first - 1 or i > last + 1]:
+            del self.chunks[index]
+        self.dirty_chunks.intersection_update(self.chunks)
+
+        if self.dirty_chunks:
+            for index in self.dirty_chunks:
+                self.render_chunk(index)
+            self.dirty_chunks.clear()
+
+        for index in range(first, last + 1):
+            if index not in self.chunks:
+                self.render_chunk(index)
+            screen.blit(self.chunks[index], (index * CHUNK_WIDTH - offset_x, 0))
+
+class Camera:
+    """Камера: видимая полоса мира шириной в экран"""
+    def __init__(self, world_width):
+        self.world_width = world_width
+        self.x = 0
+        self.prev_x = 0
+
+    def follow(self, target_x):
+        """Центрирование на target_x в пределах мира"""
+        self.prev_x = self.x
+        self.x = int(max(0, min(self.world_width - SCREEN_WIDTH, target_x - SCREEN_WIDTH // 2)))
+
+    def snap(self, target_x):
+        """Мгновенный переход без интерполяции"""
+        self.follow(target_x)
+        self.prev_x = self.x
+
+    def offset(self, alpha=1.0):
+        """Сдвиг камеры между прошлым и текущим тиком"""
+        return int(self.prev_x + (self.x - self.prev_x) * alpha)
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, render=True, dirty_rects=False,
+                 tick_rate=TICK_RATE, render_fps=FPS, vsync=False, input_source=None,
+                 sprite_loading=LOAD_BACKGROUND, profiler=None):
+        self.headless = headless
+        # render=False - только симуляция, без отрисовки кадров в step()
+        self.render = render
+        # dirty_rects=True - перерисовываются и выводятся только изменившиеся области
+        self.dirty_rects = dirty_rects
+        # Частота тиков симуляции и предел частоты кадров (0 - без ограничения);
+        # tick_step - длина тика в тиках частоты TICK_RATE
+        self.tick_rate = tick_rate
+        self.tick_step = TICK_RATE / tick_rate
+        self.render_fps = render_fps
+        # Источник масок клавиш на тик (клавиатура, воспроизведение записи)
+        self.input_source = input_source or LiveInput()
+        self.recording = None
+        # Быстрое сохранение (F5) и загрузка (F9) - снимок состояния
+        self.quick_save = None
+        # Замеры фаз кадра (оверлей по F3, выгрузка в CSV)
+        self.profiler = profiler or FrameProfiler()
+
+        # Без окна: SDL рисует в память (тесты, пакетные прогоны)
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+            if pygame.display.get_init() and pygame.display.get_driver() != "dummy":
+                pygame.display.quit()
+
         # Инициализация PyGame
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        if vsync:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT),
+                                                  pygame.SCALED, vsync=1)
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Чип и Дейл спешат на помощь")
 
         # Шрифты
@@ -456,13 +620,44 @@ class Game:
         self.small_font = pygame.font.Font(None, 24)
         self.large_font = pygame.font.Font(None, 48)
 
-        # Загрузка спрайтов
-        sprite_manager.load_sprites()
+        # Кэш текста и строки HUD, которые перерисовываются при смене значения
+        self.text_cache = TextCache()
+        self.hud_texts = [
+            HudText(self.text_cache, self.small_font, "Очки: {}", (10, 10), TEXT_COLOR),
+            HudText(self.text_cache, self.small_font, "Жизни: {}", (150, 10), TEXT_COLOR),
+            HudText(self.text_cache, self.small_font, "Уровень: {}", (280, 10), TEXT_COLOR),
+            HudText(self.text_cache, self.small_font, "Персонаж: {}", (420, 10), TEXT_COLOR),
+        ]
+        self.objective_text = HudText(self.text_cache, self.small_font, "Цель: {}",
+                                      (10, SCREEN_HEIGHT - 30), TEXT_COLOR)
+        self.controls_text = HudText(self.text_cache, self.small_font, "{}",
+                                     (SCREEN_WIDTH - 10, SCREEN_HEIGHT - 30), TEXT_COLOR,
+                                     align="right")
+        self.controls_text.set("X-смена персонажа | Z-атака | ESC-пауза")
+
+        # Готовые кадры заставок, пересобираются при смене очков или уровня
+        screen_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.overlays = {
+            "menu": OverlayScreen(screen_size, self.compose_menu),
+            "paused": OverlayScreen(screen_size, self.compose_paused),
+            "game_over": OverlayScreen(screen_size, self.compose_game_over),
+            "level_complete": OverlayScreen(screen_size, self.compose_level_complete),
+        }
+        self.dim_layer = pygame.Surface(screen_size, pygame.SRCALPHA)
+
+        # Команды отрисовки сущностей, выводятся по слоям за кадр
+        self.batch = RenderBatch(("enemies", "player", "projectiles"))
+
+        # Загрузка спрайтов: по умолчанию в фоне, меню показывается сразу,
+        # а до прихода картинок рисуются заглушки
+        with span("load_sprites", "sprites", {"mode": sprite_loading}):
+            sprite_manager.load_sprites(sprite_loading)
 
         # Игровые данные
         self.score = 0
         self.lives = 3
         self.current_level = 1
+        self.level_count = level_count()
         self.game_state = "menu"  # menu, playing, paused, game_over, level_complete
         self.level_score = 0
 
@@ -470,6 +665,8 @@ class Game:
         self.player = None
         self.level = None
         self.enemies = []
+        self.enemy_system = None
+        self.camera = None
 
         # Загрузка первого уровня
         self.load_level(self.current_level)
@@ -478,11 +675,35 @@ class Game:
         self.clock = pygame.time.Clock()
         self.running = True
 
-    def load_level(self, level_number):
-        """Загрузка уровня"""
-        self.level = Level(level_number)
-        self.player = Player(*self.level.player_start)
-        self.enemies = self.level.enemies.copy()
+        # Счетчики кадров и тиков симуляции, пропущенных тиков
+        # и маска клавиш, зажатых на прошлом тике
+        self.frame_count = 0
+        self.tick_count = 0
+        self.skipped_ticks = 0
+        self.prev_mask = 0
+
+        # Режим грязных прямоугольников: кэш фона, слой UI поверх сущностей
+        # и прямоугольники сущностей с прошлого кадра
+        self.background = None
+        self.background_level = None
+        self.background_offset = 0
+        # Сдвиг камеры прошлого кадра и сколько кадров он не менялся
+        self.frame_offset = 0
+        self.still_frames = 0
+        self.ui_layer = None
+        self.ui_rects = []
+        self.hud_key = None
+        self.prev_rects = []
+
+    def load_level(self, level_number, path=None):
+        """Загрузка уровня (path - файл уровня вместо стандартного)"""
+        with span("load_level", "level", {"level": level_number}):
+            self.level = Level(level_number, path)
+            self.player = Player(*self.level.player_start, step=self.tick_step)
+            self.enemies = self.level.enemies.copy()
+            self.enemy_system = EnemySystem(self.enemies, self.tick_step)
+        self.camera = Camera(self.level.width)
+        self.camera.snap(self.player.x + self.player.width / 2)
         self.level_score = 0
         self.game_state = "playing"
 
@@ -493,88 +714,217 @@ class Game:
                 self.running = False
 
             elif event.type == pygame.KEYDOWN:
-                if self.game_state == "playing":
-                    if event.key == pygame.K_x:
-                        self.player.switch_character()
-                    elif event.key == pygame.K_ESCAPE:
-                        self.game_state = "paused"
+                if event.key == pygame.K_F3:
+                    # Оверлей профилировщика не влияет на симуляцию
+                    self.profiler.toggle_overlay()
+                    continue
+                if event.key in (pygame.K_F5, pygame.K_F9):
+                    self.handle_quick_save(event.key)
+                    continue
+                # Нажатия обрабатываются на ближайшем тике
+                self.input_source.key_down(event.key)
+
+    def handle_quick_save(self, key):
+        """Быстрое сохранение (F5) и загрузка (F9)"""
+        if key == pygame.K_F5:
+            if self.game_state == "playing":
+                self.quick_save = self.snapshot()
+                print("💾 Игра сохранена")
+        elif self.quick_save is None:
+            print("⚠ Нет сохранения")
+        elif self.recording is not None:
+            # Загрузка сломала бы воспроизведение записи
+            print("⚠ Загрузка недоступна во время записи")
+        else:
+            self.restore(self.quick_save)
+            print("📂 Сохранение загружено")
+
+    def handle_key(self, key):
+        """Обработка нажатия клавиши"""
+        if self.game_state == "playing":
+            if key == pygame.K_x:
+                self.player.switch_character()
+            elif key == pygame.K_ESCAPE:
+                self.game_state = "paused"
 
-                elif self.game_state == "menu":
-                    if event.key == pygame.K_SPACE:
-                        self.game_state = "playing"
+        elif self.game_state == "menu":
+            if key == pygame.K_SPACE:
+                self.game_state = "playing"
 
-                elif self.game_state == "paused":
-                    if event.key == pygame.K_ESCAPE:
-                        self.game_state = "playing"
+        elif self.game_state == "paused":
+            if key == pygame.K_ESCAPE:
+                self.game_state = "playing"
 
-                elif self.game_state == "game_over":
-                    if event.key == pygame.K_r:
-                        self.restart_game()
+        elif self.game_state == "game_over":
+            if key == pygame.K_r:
+                self.restart_game()
 
-                elif self.game_state == "level_complete":
-                    if event.key == pygame.K_n:
-                        self.next_level()
+        elif self.game_state == "level_complete":
+            if key == pygame.K_n:
+                self.next_level()
+
+    def step(self, inputs=None, n_frames=1):
+        """Прогон n_frames кадров без ограничения FPS
+
+        inputs - коды клавиш (pygame.K_*), зажатых на протяжении всего шага;
+        None - маски берутся из источника ввода (например, из записи).
+        Возвращает число выполненных кадров.
+        """
+        mask = None if inputs is None else keys_to_mask(inputs)
+
+        profiler = self.profiler
+        frames = 0
+        while frames < n_frames and self.running:
+            profiler.begin_frame()
+            with span("tick"):
+                self.tick(mask)
+            if self.render:
+                sprite_manager.poll()
+                with span("draw"):
+                    self.draw()
+            profiler.end_frame()
+            frames += 1
+            self.frame_count += 1
+        return frames
+
+    def tick(self, mask=None):
+        """Один тик симуляции фиксированной длины
+
+        mask - зажатые клавиши (по умолчанию из источника ввода)
+        """
+        if mask is None:
+            mask = self.input_source.poll()
+        if self.recording is not None:
+            self.recording.record(mask)
+
+        # Клавиши, не зажатые на прошлом тике, обрабатываются как KEYDOWN
+        pressed = mask & ~self.prev_mask
+        self.prev_mask = mask
+        if pressed:
+            for key in mask_to_keys(pressed):
+                self.handle_key(key)
+
+        self.update(KeyState(mask))
+        self.tick_count += 1
+
+    def snapshot(self):
+        """Снимок состояния симуляции (bytes, см. snapshot.py)"""
+        return take_snapshot(self)
+
+    def restore(self, data):
+        """Восстановление состояния из снимка без перестройки уровня"""
+        restore_snapshot(self, data)
+
+    def start_recording(self):
+        """Начало записи сессии
+
+        Текущий уровень перезапускается, чтобы запись воспроизводилась
+        с тех же стартовых условий.
+        """
+        self.load_level(self.current_level)
+        self.prev_mask = 0
+        self.recording = Recording(self.current_level, self.score, self.lives, self.tick_rate)
+        return self.recording
+
+    def stop_recording(self):
+        """Окончание записи, возвращает запись"""
+        recording, self.recording = self.recording, None
+        return recording
+
+    def play_recording(self, recording):
+        """Запуск воспроизведения записи с ее стартовых условий"""
+        if recording.tick_rate != self.tick_rate:
+            raise ValueError("Запись сделана с другой частотой тиков")
+        self.score = recording.score
+        self.lives = recording.lives
+        self.current_level = recording.level
+        self.load_level(self.current_level)
+        self.prev_mask = 0
+        self.input_source = ReplayInput(recording)
 
-    def update(self):
+    def update(self, keys=None):
         """Обновление игровой логики"""
         if self.game_state != "playing":
             return
 
         # Обновление игрока с передачей платформ
-        keys = pygame.key.get_pressed()
-        platforms = self.level.platforms if self.level else []
-        self.player.update(keys, platforms)
-
-        # Обновление врагов
-        for enemy in self.enemies:
-            enemy.update(self.player.x)
+        if keys is None:
+            keys = pygame.key.get_pressed()
+        level = self.level
+        camera = self.camera
+        profiler = self.profiler
+        t = profiler.start()
+        self.player.update(keys, level.platform_grid, level.width,
+                           (camera.x, camera.x + SCREEN_WIDTH))
+        camera.follow(self.player.x + self.player.width / 2)
+        t = profiler.mark("player", t)
+
+        # Обновление врагов: симулируются только полосы рядом с камерой
+        self.enemy_system.wake(camera.x - CHUNK_WIDTH, camera.x + SCREEN_WIDTH + CHUNK_WIDTH)
+        self.enemy_system.update(self.player.x, level.width, SCREEN_HEIGHT)
+        t = profiler.mark("enemies", t)
 
         # Проверка столкновений
         self.check_collisions()
+        profiler.mark("collisions", t)
 
         # Проверка завершения уровня
-        if all(not enemy.is_alive for enemy in self.enemies):
+        if not self.enemy_system.any_alive():
             self.complete_level()
 
     def check_collisions(self):
         """Проверка всех столкновений"""
-        # Игрок с врагами
-        player_rect = self.player.rect
+        hit_enemy, kills = self.find_collisions()
 
-        for enemy in self.enemies:
-            if not enemy.is_alive:
-                continue
+        # Столкновение игрока с врагом
+        if hit_enemy is not None:
+            self.lives -= 1
+            if self.lives <= 0:
+                self.game_over()
+            else:
+                self.player.respawn()
+            return
 
-            enemy_rect = enemy.get_rect()
+        # Снаряды с врагами: удаляем попавшие снаряды за один проход
+        if kills:
+            spent = []
+            for slot, enemy in kills:
+                enemy.is_alive = False
+                spent.append(slot)
+                self.score += 100
+                self.level_score += 100
+
+            self.player.projectiles.release(spent)
+
+    def find_collisions(self):
+        """Поиск столкновений за кадр
+
+        Broadphase - sweep and prune по прямоугольникам EnemySystem:
+        игрок и каждый снаряд проверяются только с врагами, чей левый
+        край попадает в их полосу по x.
+        Возвращает врага, задевшего игрока (или None), и список попаданий
+        (слот снаряда в пуле, враг). Каждый снаряд и каждый враг встречаются
+        в попаданиях не больше одного раза.
+        """
+        enemies = self.enemies
+        system = self.enemy_system
+        alive = system.alive
+        index = system.broadphase()
 
-            # Столкновение игрока с врагом
-            if player_rect.colliderect(enemy_rect):
-                self.lives -= 1
-                if self.lives <= 0:
-                    self.game_over()
-                else:
-                    self.player.respawn()
-                return
+        # Игрок с врагами
+        touching = index.query_rect(*self.player.rect)
+        touching = touching[alive[touching]]
+        if touching.size:
+            return enemies[touching.min()], []
 
         # Снаряды с врагами
-        for projectile in self.player.projectiles[:]:
-            # Обновляем rect снаряда
-            projectile['rect'].x = int(projectile['x'])
-            projectile['rect'].y = int(projectile['y'])
-
-            for enemy in self.enemies:
-                if not enemy.is_alive:
-                    continue
-
-                enemy_rect = enemy.get_rect()
+        projectiles = self.player.projectiles
+        if not len(projectiles):
+            return None, []
+        kills = [(slot, enemies[target])
+                 for slot, target in projectiles.collide(index, alive)]
 
-                if projectile['rect'].colliderect(enemy_rect):
-                    enemy.is_alive = False
-                    if projectile in self.player.projectiles:
-                        self.player.projectiles.remove(projectile)
-                    self.score += 100
-                    self.level_score += 100
-                    break
+        return None, kills
 
     def complete_level(self):
         """Завершение уровня"""
@@ -589,7 +939,7 @@ class Game:
     def next_level(self):
         """Переход на следующий уровень"""
         self.current_level += 1
-        if self.current_level > 3:
+        if self.current_level > self.level_count:
             self.game_complete()
         else:
             self.load_level(self.current_level)
@@ -611,127 +961,346 @@ class Game:
         self.current_level = 1
         self.load_level(self.current_level)
 
-    def draw(self):
-        """Отрисовка игры"""
+    def draw(self, alpha=1.0):
+        """Отрисовка игры
+
+        alpha - доля пути от прошлого тика к текущему для интерполяции.
+        Возвращает список изменившихся прямоугольников экрана
+        или None, если перерисован весь экран
+        """
+        dirty = self.draw_frame(alpha)
+        if self.profiler.overlay:
+            t = self.profiler.start()
+            rect = self.profiler.draw(self.screen, self.small_font)
+            if self.dirty_rects:
+                # Под оверлеем фон восстановится в следующем кадре
+                self.prev_rects.append(rect)
+            if dirty is not None:
+                dirty.append(rect)
+            self.profiler.mark("ui", t)
+        return dirty
+
+    def draw_frame(self, alpha):
+        """Отрисовка кадра игры (без оверлея профилировщика)"""
+        if self.dirty_rects and self.game_state == "playing":
+            return self.draw_dirty(alpha)
+
+        # После полной перерисовки кэш фона строится заново
+        self.background = None
+
+        # Заставки - один готовый кадр
+        overlay = self.overlays.get(self.game_state)
+        if overlay is not None:
+            self.screen.blit(overlay.get(self.get_hud_key() + (self.level_score,)), (0, 0))
+            return None
+
         # Фон
+        profiler = self.profiler
+        t = profiler.start()
         self.screen.fill(BACKGROUND)
 
         if self.game_state == "playing":
+            offset_x = self.camera.offset(alpha)
+
             # Отрисовка уровня
             if self.level:
-                self.level.draw_platforms(self.screen)
+                self.level.draw_platforms(self.screen, offset_x)
+            t = profiler.mark("level", t)
 
-            # Отрисовка врагов
-            for enemy in self.enemies:
-                enemy.draw(self.screen)
-
-            # Отрисовка игрока
-            self.player.draw(self.screen)
+            # Отрисовка врагов и игрока: спрайты и снаряды выводятся
+            # пакетами по слоям
+            self.draw_enemies(self.screen, alpha, offset_x)
+            self.player.draw(self.screen, alpha, offset_x, self.batch)
+            self.batch.submit(self.screen)
+            t = profiler.mark("entities", t)
 
         # Отрисовка UI
         self.draw_ui()
-
-    def draw_ui(self):
-        """Отрисовка пользовательского интерфейса"""
-        # Панель статистики
+        profiler.mark("ui", t)
+        return None
+
+    def draw_dirty(self, alpha=1.0):
+        """Отрисовка только изменившихся областей поверх кэшированного фона"""
+        screen = self.screen
+        profiler = self.profiler
+        t = profiler.start()
+        hud_key = self.get_hud_key()
+        offset_x = self.camera.offset(alpha)
+
+        if offset_x != self.frame_offset:
+            self.still_frames = 0
+        else:
+            self.still_frames += 1
+        self.frame_offset = offset_x
+
+        # Новый уровень, смена состояния, сдвиг камеры или изменение
+        # платформ - полный кадр
+        full = (self.background is None or self.background_level is not self.level
+                or self.background_offset != offset_x or self.level.dirty_chunks)
+        if full and self.still_frames < STILL_FRAMES and self.background_level is self.level:
+            # Камера движется: кэш фона устарел бы к следующему кадру,
+            # поэтому кадр рисуется целиком без него, а кэш строится,
+            # когда камера постоит STILL_FRAMES кадров
+            return self.draw_moving(alpha, offset_x, hud_key)
+        rebuild = full or hud_key != self.hud_key
+        if rebuild:
+            # Фон рисуется сразу и на экран
+            self.build_background(offset_x)
+
+        if full:
+            dirty = []
+        else:
+            dirty = self.prev_rects
+            if hud_key != self.hud_key:
+                dirty.append(self.ui_rects[0])
+            if not rebuild:
+                # Восстанавливаем фон под сущностями прошлого кадра
+                for rect in dirty:
+                    screen.blit(self.background, rect, rect)
+        self.hud_key = hud_key
+        t = profiler.mark("level", t)
+
+        # Сущности
+        drawn = self.draw_enemies(screen, alpha, offset_x)
+        drawn.extend(self.player.draw(screen, alpha, offset_x, self.batch))
+        drawn.extend(self.batch.submit(screen))
+        t = profiler.mark("entities", t)
+
+        # UI остается поверх сущностей
+        for rect in drawn:
+            for ui_rect in self.ui_rects:
+                clip = rect.clip(ui_rect)
+                if clip:
+                    screen.blit(self.ui_layer, clip, clip)
+        profiler.mark("ui", t)
+
+        self.prev_rects = drawn
+        if full:
+            return None
+        return dirty + drawn
+
+    def draw_moving(self, alpha, offset_x, hud_key):
+        """Полный кадр режима грязных прямоугольников при движущейся камере"""
+        screen = self.screen
+        profiler = self.profiler
+        t = profiler.start()
+        if hud_key != self.hud_key:
+            self.build_ui_layer()
+            self.hud_key = hud_key
+        # Кэш фона (панель, платформы) мог устареть и строится заново
+        self.background_offset = None
+        screen.fill(BACKGROUND)
+        self.level.draw_platforms(screen, offset_x)
+        t = profiler.mark("level", t)
+
+        drawn = self.draw_enemies(screen, alpha, offset_x)
+        drawn.extend(self.player.draw(screen, alpha, offset_x, self.batch))
+        drawn.extend(self.batch.submit(screen))
+        t = profiler.mark("entities", t)
+
+        for rect in self.ui_rects:
+            screen.blit(self.ui_layer, rect, rect)
+        profiler.mark("ui", t)
+
+        self.prev_rects = drawn
+        return None
+
+    def draw_enemies(self, screen, alpha, offset_x):
+        """Отрисовка врагов в кадре
+
+        Спрайты откладываются в self.batch, возвращаются прямоугольники,
+        закрашенные сразу
+        """
+        enemies = self.enemies
+        batch = self.batch
+        drawn = []
+        for index in self.enemy_system.visible(offset_x - VIEW_MARGIN,
+                                               offset_x + SCREEN_WIDTH + VIEW_MARGIN):
+            rect = enemies[index].draw(screen, alpha, offset_x, batch)
+            if rect:
+                drawn.append(rect)
+        return drawn
+
+    def get_hud_key(self):
+        """Значения, от которых зависит панель статистики"""
+        character = self.player.character if self.player else 'Чип'
+        return (self.score, self.lives, self.current_level, character)
+
+    def build_background(self, offset_x):
+        """Построение кэша фона: заливка, платформы и слой UI
+
+        Фон рисуется на экран и копируется в кэш: полосы уровня всегда
+        выводятся на экран, иначе SDL перекодирует их RLE при каждой
+        смене поверхности назначения.
+        """
+        screen = self.screen
+        if self.background is None:
+            self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.ui_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+
+        self.build_ui_layer()
+
+        screen.fill(BACKGROUND)
+        self.level.draw_platforms(screen, offset_x)
+        # Вне своих прямоугольников слой UI прозрачен
+        for rect in self.ui_rects:
+            screen.blit(self.ui_layer, rect, rect)
+        self.background.blit(screen, (0, 0))
+        self.background_level = self.level
+        self.background_offset = offset_x
+
+    def build_ui_layer(self):
+        """Слой UI: панель статистики и подсказки на прозрачном фоне"""
+        self.ui_layer.fill((0, 0, 0, 0))
+        self.ui_rects = [self.draw_hud(self.ui_layer)] + self.draw_hints(self.ui_layer)
+
+    def draw_hud(self, surface):
+        """Панель статистики, возвращает ее прямоугольник"""
         stats_bg = pygame.Rect(0, 0, SCREEN_WIDTH, 40)
-        pygame.draw.rect(self.screen, PLATFORM_MAIN, stats_bg)
-        pygame.draw.rect(self.screen, PLATFORM_TOP, stats_bg, 2)
+        pygame.draw.rect(surface, PLATFORM_MAIN, stats_bg)
+        pygame.draw.rect(surface, PLATFORM_TOP, stats_bg, 2)
 
         # Тексты статистики
-        score_text = self.small_font.render(f"Очки: {self.score}", True, TEXT_COLOR)
-        lives_text = self.small_font.render(f"Жизни: {self.lives}", True, TEXT_COLOR)
-        level_text = self.small_font.render(f"Уровень: {self.current_level}", True, TEXT_COLOR)
-        char_text = self.small_font.render(f"Персонаж: {self.player.character if self.player else 'Чип'}", True, TEXT_COLOR)
+        for widget, value in zip(self.hud_texts, self.get_hud_key()):
+            widget.set(value)
+            widget.draw(surface)
+        return stats_bg
 
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(lives_text, (150, 10))
-        self.screen.blit(level_text, (280, 10))
-        self.screen.blit(char_text, (420, 10))
+    def draw_hints(self, surface):
+        """Цель уровня и подсказки управления, возвращает их прямоугольники"""
+        rects = []
 
         # Цель уровня
-        if self.level and self.game_state == "playing":
-            obj_text = self.small_font.render(f"Цель: {self.level.objective}", True, TEXT_COLOR)
-            self.screen.blit(obj_text, (10, SCREEN_HEIGHT - 30))
+        if self.level:
+            self.objective_text.set(self.level.objective)
+            rects.append(self.objective_text.draw(surface))
+
+        # Подсказки управления
+        rects.append(self.controls_text.draw(surface))
+        return rects
 
-        # Подсказки управления (только во время игры)
+    def draw_ui(self):
+        """Отрисовка пользовательского интерфейса"""
+        # Панель статистики
+        self.draw_hud(self.screen)
+
+        # Цель уровня и подсказки (только во время игры)
         if self.game_state == "playing":
-            controls_text = self.small_font.render("X-смена персонажа | Z-атака | ESC-пауза", True, TEXT_COLOR)
-            self.screen.blit(controls_text, (SCREEN_WIDTH - controls_text.get_width() - 10, SCREEN_HEIGHT - 30))
-
-        # Экран меню
-        if self.game_state == "menu":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 200))
-            self.screen.blit(overlay, (0, 0))
-
-            title = self.large_font.render("Чип и Дейл спешат на помощь", True, PLAYER_CHIP)
-            self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
-
-            controls = [
-                "Управление:",
-                "← → - Движение",
-                "Пробел - Прыжок",
-                "Z - Атака",
-                "X - Смена персонажа",
-                "ESC - Пауза/Выход",
-                "",
-                "Нажми ПРОБЕЛ чтобы начать"
-            ]
-
-            for i, line in enumerate(controls):
-                text = self.font.render(line, True, TEXT_COLOR)
-                self.screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 200 + i*40))
-
-        # Экран паузы
-        elif self.game_state == "paused":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            self.screen.blit(overlay, (0, 0))
+            self.draw_hints(self.screen)
+
+    def compose_base(self, surface, alpha):
+        """Основа заставки: фон, панель статистики и затемнение"""
+        surface.fill(BACKGROUND)
+        self.draw_hud(surface)
+        self.dim_layer.fill((0, 0, 0, alpha))
+        surface.blit(self.dim_layer, (0, 0))
+
+    def compose_menu(self, surface):
+        """Экран меню"""
+        self.compose_base(surface, 200)
+
+        title = self.large_font.render("Чип и Дейл спешат на помощь", True, PLAYER_CHIP)
+        surface.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 100))
+
+        controls = [
+            "Управление:",
+            "← → - Движение",
+            "Пробел - Прыжок",
+            "Z - Атака",
+            "X - Смена персонажа",
+            "ESC - Пауза/Выход",
+            "",
+            "Нажми ПРОБЕЛ чтобы начать"
+        ]
 
-            pause_text = self.large_font.render("ПАУЗА", True, TEXT_COLOR)
-            self.screen.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, 250))
+        for i, line in enumerate(controls):
+            text = self.font.render(line, True, TEXT_COLOR)
+            surface.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 200 + i*40))
 
-            inst_text = self.font.render("Нажми ESC чтобы продолжить", True, TEXT_COLOR)
-            self.screen.blit(inst_text, (SCREEN_WIDTH//2 - inst_text.get_width()//2, 320))
+    def compose_paused(self, surface):
+        """Экран паузы"""
+        self.compose_base(surface, 150)
 
-        # Game Over
-        elif self.game_state == "game_over":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 200))
-            self.screen.blit(overlay, (0, 0))
+        pause_text = self.large_font.render("ПАУЗА", True, TEXT_COLOR)
+        surface.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, 250))
 
-            game_over_text = self.large_font.render("ИГРА ОКОНЧЕНА", True, (255, 0, 0))
-            score_text = self.font.render(f"Ваш счет: {self.score}", True, TEXT_COLOR)
-            restart_text = self.font.render("Нажми R чтобы начать заново", True, TEXT_COLOR)
+        inst_text = self.font.render("Нажми ESC чтобы продолжить", True, TEXT_COLOR)
+        surface.blit(inst_text, (SCREEN_WIDTH//2 - inst_text.get_width()//2, 320))
 
-            self.screen.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, 200))
-            self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
-            self.screen.blit(restart_text, (SCREEN_WIDTH//2 - restart_text.get_width()//2, 340))
+    def compose_game_over(self, surface):
+        """Экран конца игры"""
+        self.compose_base(surface, 200)
 
-        # Уровень пройден
-        elif self.game_state == "level_complete":
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            self.screen.blit(overlay, (0, 0))
+        game_over_text = self.large_font.render("ИГРА ОКОНЧЕНА", True, (255, 0, 0))
+        score_text = self.font.render(f"Ваш счет: {self.score}", True, TEXT_COLOR)
+        restart_text = self.font.render("Нажми R чтобы начать заново", True, TEXT_COLOR)
+
+        surface.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, 200))
+        surface.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
+        surface.blit(restart_text, (SCREEN_WIDTH//2 - restart_text.get_width()//2, 340))
 
-            complete_text = self.large_font.render(f"УРОВЕНЬ {self.current_level} ПРОЙДЕН!", True, (0, 255, 0))
-            score_text = self.font.render(f"Очки за уровень: {self.level_score}", True, TEXT_COLOR)
-            next_text = self.font.render("Нажми N для следующего уровня", True, TEXT_COLOR)
+    def compose_level_complete(self, surface):
+        """Экран завершения уровня"""
+        self.compose_base(surface, 180)
 
-            self.screen.blit(complete_text, (SCREEN_WIDTH//2 - complete_text.get_width()//2, 200))
-            self.screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
-            self.screen.blit(next_text, (SCREEN_WIDTH//2 - next_text.get_width()//2, 340))
+        complete_text = self.large_font.render(f"УРОВЕНЬ {self.current_level} ПРОЙДЕН!", True, (0, 255, 0))
+        score_text = self.font.render(f"Очки за уровень: {self.level_score}", True, TEXT_COLOR)
+        next_text = self.font.render("Нажми N для следующего уровня", True, TEXT_COLOR)
+
+        surface.blit(complete_text, (SCREEN_WIDTH//2 - complete_text.get_width()//2, 200))
+        surface.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 280))
+        surface.blit(next_text, (SCREEN_WIDTH//2 - next_text.get_width()//2, 340))
 
     def run(self):
-        """Главный игровой цикл"""
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
+        """Главный игровой цикл
+
+        Симуляция идет тиками фиксированной длины 1/tick_rate, накопленными
+        по реальному времени, отрисовка - с интерполяцией между двумя
+        последними тиками. Если тики не успевают, лишнее время отбрасывается.
+        """
+        tick_time = 1.0 / self.tick_rate
+        accumulator = 0.0
+        previous = time.perf_counter()
 
-            pygame.display.flip()
-            self.clock.tick(FPS)
+        profiler = self.profiler
+        while self.running:
+            profiler.begin_frame()
+            now = time.perf_counter()
+            accumulator += min(now - previous, MAX_FRAME_TIME)
+            previous = now
+
+            t = profiler.start()
+            with span("events"):
+                self.handle_events()
+            profiler.mark("events", t)
+            sprite_manager.poll()
+
+            ticks = 0
+            while accumulator >= tick_time and self.running:
+                if ticks == MAX_TICKS_PER_FRAME:
+                    # Защита от спирали смерти: пропускаем отставание
+                    self.skipped_ticks += int(accumulator / tick_time)
+                    accumulator = 0.0
+                    break
+                with span("tick"):
+                    self.tick()
+                accumulator -= tick_time
+                ticks += 1
+
+            with span("draw"):
+                dirty = self.draw(accumulator / tick_time)
+
+            t = profiler.start()
+            with span("flip"):
+                if dirty is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty)
+            profiler.mark("flip", t)
+            # Ожидание до следующего кадра в замер не входит
+            profiler.end_frame()
+            self.clock.tick(self.render_fps)
+            self.frame_count += 1
 
         pygame.quit()
-        sys.exit()
\ No newline at end of file
+        sys.exit()
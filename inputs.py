@@ -0,0 +1,163 @@
+"""
+Источники ввода, запись и воспроизведение сессий
+"""
+
+import struct
+import pygame
+
+# Биты маски клавиш на тик
+LEFT = 1
+RIGHT = 2
+SPACE = 4
+Z = 8
+X = 16
+ESC = 32
+R = 64
+N = 128
+
+KEY_BITS = {
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT,
+    pygame.K_SPACE: SPACE,
+    pygame.K_z: Z,
+    pygame.K_x: X,
+    pygame.K_ESCAPE: ESC,
+    pygame.K_r: R,
+    pygame.K_n: N,
+}
+
+# Формат файла записи: заголовок и серии (маска, длина серии в тиках)
+MAGIC = b"CDRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBHBiB")
+RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+
+def keys_to_mask(keys):
+    """Маска по набору кодов клавиш pygame.K_*"""
+    mask = 0
+    for key in keys:
+        mask |= KEY_BITS.get(key, 0)
+    return mask
+
+
+def mask_to_keys(mask):
+    """Коды клавиш, биты которых выставлены в маске"""
+    return [key for key, bit in KEY_BITS.items() if mask & bit]
+
+
+class KeyState:
+    """Зажатые клавиши в виде маски, совместимо с pygame.key.get_pressed()"""
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+class InputSource:
+    """Источник ввода: маска зажатых клавиш на каждый тик"""
+    def poll(self):
+        """Маска на очередной тик"""
+        return 0
+
+    def key_down(self, key):
+        """Событие KEYDOWN из окна (живой ввод)"""
+
+
+class LiveInput(InputSource):
+    """Ввод с клавиатуры
+
+    Нажатия, отпущенные раньше ближайшего тика, тоже попадают в маску.
+    """
+    def __init__(self):
+        self.tapped = 0
+
+    def poll(self):
+        pressed = pygame.key.get_pressed()
+        mask = self.tapped
+        for key, bit in KEY_BITS.items():
+            if pressed[key]:
+                mask |= bit
+        self.tapped = 0
+        return mask
+
+    def key_down(self, key):
+        self.tapped |= KEY_BITS.get(key, 0)
+
+
+class Recording:
+    """Запись сессии: стартовые условия и маски по тикам сериями (RLE)"""
+    def __init__(self, level=1, score=0, lives=3, tick_rate=60):
+        self.level = level
+        self.score = score
+        self.lives = lives
+        self.tick_rate = tick_rate
+        self.masks = []
+        self.counts = []
+
+    def record(self, mask):
+        """Добавление маски очередного тика"""
+        if self.masks and self.masks[-1] == mask and self.counts[-1] < MAX_RUN:
+            self.counts[-1] += 1
+        else:
+            self.masks.append(mask)
+            self.counts.append(1)
+
+    def ticks(self):
+        """Длина записи в тиках"""
+        return sum(self.counts)
+
+    def to_bytes(self):
+        """Упаковка в двоичный формат"""
+        header = HEADER.pack(MAGIC, VERSION, self.tick_rate, self.level,
+                             self.score, self.lives)
+        runs = b"".join(RUN.pack(mask, count)
+                        for mask, count in zip(self.masks, self.counts))
+        return header + runs
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Распаковка из двоичного формата"""
+        magic, version, tick_rate, level, score, lives = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Неизвестный формат записи")
+        recording = cls(level, score, lives, tick_rate)
+        for mask, count in RUN.iter_unpack(data[HEADER.size:]):
+            recording.masks.append(mask)
+            recording.counts.append(count)
+        return recording
+
+    def save(self, path):
+        """Сохранение в файл"""
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Загрузка из файла"""
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayInput(InputSource):
+    """Воспроизведение записи тик за тиком"""
+    def __init__(self, recording):
+        self.recording = recording
+        self.run = 0
+        self.left = recording.counts[0] if recording.counts else 0
+        self.finished = not recording.counts
+
+    def poll(self):
+        if self.finished:
+            return 0
+        mask = self.recording.masks[self.run]
+        self.left -= 1
+        if self.left == 0:
+            self.run += 1
+            if self.run < len(self.recording.counts):
+                self.left = self.recording.counts[self.run]
+            else:
+                self.finished = True
+        return mask
@@ -0,0 +1,158 @@
+"""
+Загрузка уровней из JSON с компилированным двоичным кэшем
+
+Файл уровня levels/levelN.json при первой загрузке компилируется
+в levels/.cache/levelN-<хэш пути>.bin. Кэш помечен временем изменения
+исходника и при следующих загрузках читается без разбора JSON.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from array import array
+
+from enemies import TYPE_CODES
+from tracing import span
+
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+CACHE_DIR = os.path.join(LEVELS_DIR, ".cache")
+
+# Заголовок кэша: сигнатура, версия, mtime исходника, ширина уровня,
+# старт игрока, количество платформ и врагов, длина имени и цели в байтах
+MAGIC = b"CDLV"
+VERSION = 2
+HEADER = struct.Struct("<4sHqIiiIIHH")
+
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+class LevelData:
+    """Описание уровня в компактных таблицах
+
+    platforms - array('i') по 4 числа на платформу (x, y, width, height),
+    enemy_positions/enemy_speeds - array('d'), enemy_types - array('B').
+    width - ширина мира (0 - по крайней правой платформе).
+    """
+    def __init__(self, name="", objective="", player_start=(50, 300), width=0):
+        self.name = name
+        self.objective = objective
+        self.player_start = tuple(player_start)
+        self.width = width
+        self.platforms = array("i")
+        self.enemy_positions = array("d")
+        self.enemy_speeds = array("d")
+        self.enemy_types = array("B")
+
+    def platform_tuples(self):
+        """Платформы списком кортежей (x, y, width, height)"""
+        p = self.platforms
+        return [tuple(p[i:i + 4]) for i in range(0, len(p), 4)]
+
+    def enemy_specs(self):
+        """Враги списком (x, y, тип, скорость)"""
+        pos = self.enemy_positions
+        return [(pos[2 * i], pos[2 * i + 1], TYPE_NAMES[code], self.enemy_speeds[i])
+                for i, code in enumerate(self.enemy_types)]
+
+
+def level_path(number):
+    """Путь к файлу уровня по номеру"""
+    return os.path.join(LEVELS_DIR, f"level{number}.json")
+
+
+def level_count():
+    """Количество уровней, идущих подряд с первого"""
+    count = 0
+    while os.path.exists(level_path(count + 1)):
+        count += 1
+    return count
+
+
+def parse_level(source):
+    """Разбор словаря в формате файла уровня"""
+    level = LevelData(source.get("name", ""), source.get("objective", ""),
+                      source.get("player_start", (50, 300)), int(source.get("width", 0)))
+    for platform in source.get("platforms", ()):
+        level.platforms.extend(int(value) for value in platform)
+    for x, y, enemy_type, speed in source.get("enemies", ()):
+        level.enemy_positions.extend((x, y))
+        level.enemy_speeds.append(speed)
+        level.enemy_types.append(TYPE_CODES[enemy_type])
+    return level
+
+
+def compile_level(level, mtime):
+    """Упаковка уровня в двоичный формат кэша"""
+    name = level.name.encode("utf-8")
+    objective = level.objective.encode("utf-8")
+    header = HEADER.pack(MAGIC, VERSION, mtime, level.width,
+                         int(level.player_start[0]), int(level.player_start[1]),
+                         len(level.platforms) // 4, len(level.enemy_types),
+                         len(name), len(objective))
+    return b"".join((header, name, objective,
+                     level.platforms.tobytes(), level.enemy_positions.tobytes(),
+                     level.enemy_speeds.tobytes(), level.enemy_types.tobytes()))
+
+
+def decode_level(data, mtime):
+    """Распаковка кэша; ValueError если кэш устарел или поврежден"""
+    (magic, version, cached_mtime, width, start_x, start_y,
+     platform_count, enemy_count, name_size, objective_size) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or cached_mtime != mtime:
+        raise ValueError("Кэш уровня устарел")
+
+    offset = HEADER.size
+    name = data[offset:offset + name_size].decode("utf-8")
+    offset += name_size
+    objective = data[offset:offset + objective_size].decode("utf-8")
+    offset += objective_size
+
+    level = LevelData(name, objective, (start_x, start_y), width)
+    for table, count in ((level.platforms, platform_count * 4),
+                         (level.enemy_positions, enemy_count * 2),
+                         (level.enemy_speeds, enemy_count),
+                         (level.enemy_types, enemy_count)):
+        size = count * table.itemsize
+        table.frombytes(data[offset:offset + size])
+        offset += size
+    if offset != len(data):
+        raise ValueError("Кэш уровня поврежден")
+    return level
+
+
+def cache_path(path):
+    """Путь к двоичному кэшу для файла уровня
+
+    К имени добавляется хэш полного пути: одноименные уровни из разных
+    каталогов (например, сгенерированные) не делят кэш
+    """
+    path = os.path.abspath(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"{name}-{digest}.bin")
+
+
+def load_level_data(path):
+    """Загрузка уровня: из кэша, если он свежий, иначе из JSON с компиляцией"""
+    mtime = os.stat(path).st_mtime_ns
+    cached = cache_path(path)
+    try:
+        with span("decode_level", "level", {"path": cached}), open(cached, "rb") as f:
+            return decode_level(f.read(), mtime)
+    except (OSError, ValueError, struct.error):
+        pass
+
+    with span("parse_level", "level", {"path": path}), open(path, encoding="utf-8") as f:
+        level = parse_level(json.load(f))
+
+    # Кэш пишется через временный файл; ошибка записи не мешает игре
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp = cached + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(compile_level(level, mtime))
+        os.replace(temp, cached)
+    except OSError as e:
+        print(f"⚠ Не удалось записать кэш уровня {cached}: {e}")
+    return level
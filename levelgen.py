@@ -0,0 +1,168 @@
+"""
+Генератор больших уровней для нагрузочных прогонов
+
+Уровень строится по зерну и всегда одинаков для одних параметров.
+Каждая платформа ставится в пределах прыжка от уже поставленной
+(опора ищется рядом со случайной точкой мира, поэтому платформы
+расходятся по всей ширине) и достижима с земли. Платформы не
+пересекаются, между платформами друг над другом проходит игрок,
+у точки старта игрока платформ нет; враги стоят на платформах.
+Результат - обычный файл уровня, его загружает Level(номер, путь).
+
+    python levelgen.py файл.json [--seed N] [--platforms N] [--ground N]
+                       [--flying N] [--boss N] [--width N]
+"""
+
+import json
+import random
+import sys
+
+from cli import option
+
+# Прыжок игрока: jump_power=12, gravity=0.5 - подъем 138 (гравитация
+# применяется до сдвига), скорость 5. Подъем и зазор взяты с запасом
+MAX_RISE = 110
+MAX_GAP = 150
+PLATFORM_WIDTHS = (60, 200)
+PLATFORM_HEIGHT = 20
+# Просвет по высоте между платформами, перекрывающимися по x: рост игрока с запасом
+CLEARANCE = 60 + 20
+# Верх платформ: не выше TOP_LIMIT и с просветом над землей
+TOP_LIMIT = 150
+GROUND_Y = 550
+LOWEST = GROUND_Y - CLEARANCE - PLATFORM_HEIGHT
+PLAYER_START = (50, 300)
+# Свободная зона старта: прямоугольник игрока с запасом по x
+SPAWN_CLEAR = (PLAYER_START[0] - 40, PLAYER_START[1], 40 + 80, 60)
+# Враги не ставятся ближе к старту игрока
+SAFE_ZONE = 300
+# Попыток поставить одну платформу, прежде чем сдаться
+ATTEMPTS = 200
+# Ширина ячейки индекса платформ (по левому краю)
+CELL = 200
+
+ENEMY_SIZE = {"ground": 40, "flying": 40, "boss": 60}
+ENEMY_SPEEDS = {"ground": (1, 1.5, 2), "flying": (1, 1.5), "boss": (0.5, 1)}
+# Босс удерживается в полосе y 50..450 (см. EnemySystem.update)
+BOSS_TOP = 50 + 60
+BOSS_BOTTOM = 450 + 60
+
+
+def crowded(a, b):
+    """Перекрываются ли a и b по x, оставляя меньше CLEARANCE по высоте"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return (ax < bx + bw and bx < ax + aw and
+            ay < by + bh + CLEARANCE and by < ay + ah + CLEARANCE)
+
+
+def nearby(cells, left, right):
+    """Платформы индекса, левый край которых в ячейках полосы [left, right]"""
+    for cell in range(left // CELL, right // CELL + 1):
+        yield from cells.get(cell, ())
+
+
+def place_platform(rng, width, ground, cells):
+    """Кандидат в платформы в пределах прыжка от опоры или None"""
+    # Опора - земля или платформа, с которой достижима случайная точка мира
+    target = rng.randrange(width)
+    anchors = [p for p in nearby(cells, target - MAX_GAP - PLATFORM_WIDTHS[1], target + MAX_GAP)
+               if p[0] - MAX_GAP <= target <= p[0] + p[2] + MAX_GAP]
+    ax, ay, aw, ah = anchors[rng.randrange(len(anchors) + 1) - 1] if anchors else ground
+
+    w = rng.randrange(PLATFORM_WIDTHS[0], PLATFORM_WIDTHS[1] + 1)
+    low = max(0, ax - MAX_GAP - w)
+    high = min(width - w, ax + aw + MAX_GAP)
+    x = max(low, min(high, target - w // 2))
+    # Выше опоры - не больше чем на MAX_RISE, ниже - куда угодно
+    top = max(TOP_LIMIT, ay - MAX_RISE)
+    if top > LOWEST:
+        return None
+    return [x, rng.randrange(top, LOWEST + 1), w, PLATFORM_HEIGHT]
+
+
+def fits(platform, cells):
+    """Не задевает ли платформа зону старта и уже поставленные платформы"""
+    x, _, w, _ = platform
+    if crowded(platform, SPAWN_CLEAR):
+        return False
+    return not any(crowded(platform, other)
+                   for other in nearby(cells, x - PLATFORM_WIDTHS[1], x + w))
+
+
+def generate_level(seed=0, platforms=50, ground=20, flying=10, boss=1, width=4000,
+                   name=None):
+    """Описание уровня в формате файла levels/levelN.json
+
+    ValueError, если platforms платформ не удается разместить в ширину width.
+    """
+    rng = random.Random(seed)
+    width = max(width, 800)
+
+    # Земля во всю ширину мира - первая опора
+    items = [[0, GROUND_Y, width, 50]]
+    cells = {}
+    for _ in range(platforms - 1):
+        for _ in range(ATTEMPTS):
+            platform = place_platform(rng, width, items[0], cells)
+            if platform and fits(platform, cells):
+                break
+        else:
+            raise ValueError(f"{platforms} платформ не помещаются в ширину {width}")
+        items.append(platform)
+        cells.setdefault(platform[0] // CELL, []).append(platform)
+
+    enemies = []
+    for kind, count in (("ground", ground), ("flying", flying), ("boss", boss)):
+        size = ENEMY_SIZE[kind]
+        surfaces = [p for p in items if p[2] >= size and p[0] + p[2] - size >= SAFE_ZONE]
+        if kind == "boss":
+            surfaces = [p for p in surfaces if BOSS_TOP <= p[1] <= BOSS_BOTTOM]
+        if not surfaces:
+            surfaces = [items[0]]
+        for _ in range(count):
+            x, y, w, h = surfaces[rng.randrange(len(surfaces))]
+            left = max(x, SAFE_ZONE)
+            ex = rng.randrange(left, x + w - size + 1)
+            enemies.append([ex, y - size, kind, rng.choice(ENEMY_SPEEDS[kind])])
+
+    total = ground + flying + boss
+    return {
+        "name": name or f"Сгенерированный уровень {seed}",
+        "objective": f"Победите {total} врагов!",
+        "player_start": list(PLAYER_START),
+        "width": width,
+        "platforms": items,
+        "enemies": enemies,
+    }
+
+
+def write_level(path, **params):
+    """Генерация уровня в файл path, возвращает описание уровня"""
+    level = generate_level(**params)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(level, f, ensure_ascii=False)
+    return level
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print(__doc__)
+        sys.exit(1)
+
+    params = {}
+    for name in ("seed", "platforms", "ground", "flying", "boss", "width"):
+        if f"--{name}" in args:
+            params[name] = int(option(args, f"--{name}"))
+    try:
+        level = write_level(args[0], **params)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Уровень записан: {args[0]} ({len(level['platforms'])} платформ, "
+          f"{len(level['enemies'])} врагов, ширина {level['width']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,87 @@
 """
 Главный файл игры
+
+Запуск без окна с замером скорости симуляции:
+    python main.py --headless [кадров]
+Запись и воспроизведение сессии:
+    python main.py --record файл
+    python main.py --replay файл [--headless]
+Быстрое сохранение и загрузка в игре - клавиши F5 и F9.
+Замер фаз кадра с выгрузкой в CSV (оверлей - клавиша F3):
+    python main.py --profile файл.csv
+Трасса для chrome://tracing или ui.perfetto.dev:
+    python main.py --trace файл.json
 """
 
 import pygame
 import sys
+import time
+from cli import option
 from game import Game
+from inputs import Recording
+from profiler import FrameProfiler
+from tracing import ChromeTraceExporter
+
+def run_headless(frames, profiler=None):
+    """Прогон симуляции без окна и без ограничения FPS"""
+    game = Game(headless=True, render=False, profiler=profiler)
+    start = time.perf_counter()
+    done = game.step(n_frames=frames)
+    elapsed = time.perf_counter() - start
+    print(f"Кадров: {done}, время: {elapsed:.3f} с, "
+          f"скорость: {done / elapsed:.0f} кадров/с")
+
+def run_replay_headless(recording, profiler=None):
+    """Быстрое воспроизведение записи без окна"""
+    game = Game(headless=True, render=False, profiler=profiler)
+    game.play_recording(recording)
+    start = time.perf_counter()
+    done = game.step(n_frames=recording.ticks())
+    elapsed = time.perf_counter() - start
+    print(f"Тиков: {done}, время: {elapsed:.3f} с, очки: {game.score}, "
+          f"жизни: {game.lives}, уровень: {game.current_level}")
 
 def main():
+    args = sys.argv[1:]
+    recording = None
+    profiler = None
+    tracer = None
     try:
+        if "--trace" in args:
+            tracer = ChromeTraceExporter().attach()
+        if "--profile" in args:
+            profiler = FrameProfiler(csv_path=option(args, "--profile") or "profile.csv")
         pygame.init()
-        game = Game()
-        game.run()
+        if "--replay" in args:
+            replay = Recording.load(option(args, "--replay"))
+            if "--headless" in args:
+                run_replay_headless(replay, profiler)
+            else:
+                game = Game(profiler=profiler)
+                game.play_recording(replay)
+                game.run()
+        elif "--headless" in args:
+            frames = option(args, "--headless")
+            run_headless(int(frames) if frames else 10000, profiler)
+        else:
+            game = Game(profiler=profiler)
+            if "--record" in args:
+                recording = game.start_recording()
+            game.run()
     except Exception as e:
         print(f"Ошибка: {e}")
         import traceback
         traceback.print_exc()
     finally:
+        if recording is not None:
+            recording.save(option(args, "--record"))
+        if profiler is not None:
+            profiler.save_csv()
+        if tracer is not None:
+            tracer.detach()
+            tracer.save(option(args, "--trace") or "trace.json")
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
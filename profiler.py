@@ -0,0 +1,121 @@
+"""
+Профилировщик кадра по фазам: оверлей с процентилями и выгрузка в CSV
+"""
+
+import csv
+from collections import deque
+from time import perf_counter_ns
+
+import numpy as np
+import pygame
+
+# Фазы кадра в порядке выполнения
+PHASES = ("events", "player", "enemies", "collisions", "level", "entities", "ui", "flip")
+
+# Оверлей перерисовывается раз в столько кадров
+OVERLAY_PERIOD = 15
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+
+
+class FrameProfiler:
+    """Время фаз кадра по таймеру perf_counter_ns
+
+    Пока профилировщик выключен, start() и mark() ничего не замеряют.
+    Кадры копятся в скользящем окне для процентилей оверлея и, если
+    задан csv_path, целиком для выгрузки в CSV. Время фаз, которые
+    выполняются несколько раз за кадр (тики симуляции), суммируется.
+    """
+    def __init__(self, window=300, csv_path=None):
+        self.csv_path = csv_path
+        self.enabled = csv_path is not None
+        self.overlay = False
+        self.phase_index = {phase: i for i, phase in enumerate(PHASES)}
+        self.current = [0] * len(PHASES)
+        self.frame_start = 0
+        self.frame = 0
+        # Строки (кадр, полное время, время фаз...) в наносекундах
+        self.window = deque(maxlen=window)
+        self.samples = []
+        self.overlay_surface = None
+
+    def start(self):
+        """Отметка времени для mark() (0 если выключен)"""
+        return perf_counter_ns() if self.enabled else 0
+
+    def mark(self, phase, start):
+        """Добавление времени с отметки start к фазе, возвращает новую отметку"""
+        if not self.enabled:
+            return 0
+        now = perf_counter_ns()
+        self.current[self.phase_index[phase]] += now - start
+        return now
+
+    def begin_frame(self):
+        """Начало кадра"""
+        if self.enabled:
+            self.frame_start = perf_counter_ns()
+
+    def end_frame(self):
+        """Конец кадра: время фаз уходит в выборки"""
+        if not self.enabled:
+            return
+        row = (self.frame, perf_counter_ns() - self.frame_start, *self.current)
+        self.window.append(row)
+        if self.csv_path is not None:
+            self.samples.append(row)
+        self.current = [0] * len(PHASES)
+        self.frame += 1
+
+    def toggle_overlay(self):
+        """Показ и скрытие оверлея (F3); оверлей включает замеры"""
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.csv_path is not None
+        self.overlay_surface = None
+
+    def percentiles(self):
+        """p50/p95/p99 по окну в миллисекундах: {фаза: (p50, p95, p99)}"""
+        if not self.window:
+            return {}
+        times = np.array(self.window, dtype=np.float64)[:, 1:] / 1e6
+        values = np.percentile(times, (50, 95, 99), axis=0)
+        return {phase: tuple(values[:, i].tolist())
+                for i, phase in enumerate(("frame",) + PHASES)}
+
+    def render_overlay(self, font):
+        """Таблица процентилей на полупрозрачной подложке"""
+        rows = [("мс", "p50", "p95", "p99")]
+        for phase, values in self.percentiles().items():
+            rows.append((phase,) + tuple(f"{value:.2f}" for value in values))
+        cells = [[font.render(text, True, OVERLAY_COLOR) for text in row] for row in rows]
+
+        # Шрифт не моноширинный: имена выравниваются влево, числа вправо
+        widths = [max(row[i].get_width() for row in cells) + 12 for i in range(4)]
+        line_height = font.get_linesize()
+        surface = pygame.Surface((sum(widths) + 12, line_height * len(cells) + 8),
+                                 pygame.SRCALPHA)
+        surface.fill(OVERLAY_BACKGROUND)
+        for i, row in enumerate(cells):
+            y = 4 + i * line_height
+            surface.blit(row[0], (6, y))
+            right = 6 + widths[0]
+            for cell, width in zip(row[1:], widths[1:]):
+                right += width
+                surface.blit(cell, (right - cell.get_width() - 6, y))
+        return surface
+
+    def draw(self, screen, font):
+        """Отрисовка оверлея в правом верхнем углу, возвращает его прямоугольник"""
+        if self.overlay_surface is None or self.frame % OVERLAY_PERIOD == 0:
+            self.overlay_surface = self.render_overlay(font)
+        x = screen.get_width() - self.overlay_surface.get_width() - 10
+        return screen.blit(self.overlay_surface, (x, 40))
+
+    def save_csv(self, path=None):
+        """Выгрузка всех кадров в CSV (времена в наносекундах)"""
+        path = path or self.csv_path
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "frame_ns") + tuple(phase + "_ns" for phase in PHASES))
+            writer.writerows(self.samples)
+        print(f"📊 Профиль кадров записан: {path} ({len(self.samples)} кадров)")
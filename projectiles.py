@@ -0,0 +1,125 @@
+"""
+Пул снарядов на массивах NumPy
+"""
+
+import numpy as np
+
+
+class ProjectilePool:
+    """Пул снарядов фиксированной емкости
+
+    Снаряды хранятся в массивах (x, y, width, height, speed, alive),
+    освободившиеся слоты переиспользуются. Движение, отсечение за
+    границами и проверка попаданий выполняются векторно.
+    """
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.width = np.zeros(capacity)
+        self.height = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        # Порядковый номер выстрела - снаряды обрабатываются в порядке появления
+        self.serial = np.zeros(capacity, dtype=np.int64)
+        self.next_serial = 0
+        self.count = 0
+        # Стек свободных слотов, первым выдается слот 0
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def spawn(self, x, y, width, height, speed):
+        """Новый снаряд, возвращает слот или -1 если пул заполнен"""
+        if not self.free:
+            return -1
+        slot = self.free.pop()
+        self.x[slot] = x
+        self.y[slot] = y
+        self.width[slot] = width
+        self.height[slot] = height
+        self.speed[slot] = speed
+        self.alive[slot] = True
+        self.serial[slot] = self.next_serial
+        self.next_serial += 1
+        self.count += 1
+        return slot
+
+    def release(self, slots):
+        """Освобождение слотов"""
+        slots = np.asarray(slots, dtype=np.intp)
+        if slots.size == 0:
+            return
+        self.alive[slots] = False
+        # У свободных слотов скорость 0 - update() сдвигает массив целиком
+        self.speed[slots] = 0
+        self.free.extend(slots.tolist())
+        self.count -= slots.size
+
+    def clear(self):
+        """Удаление всех снарядов"""
+        self.alive[:] = False
+        self.speed[:] = 0
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def update(self, left, right):
+        """Движение снарядов и удаление улетевших за границы [left, right]"""
+        if not self.count:
+            return
+        self.x += self.speed
+        out = self.alive & ((self.x > right) | (self.x + self.width < left))
+        if out.any():
+            self.release(np.flatnonzero(out))
+
+    def slots(self):
+        """Слоты живых снарядов"""
+        return np.flatnonzero(self.alive)
+
+    def rects(self, alpha=1.0, offset_x=0):
+        """Прямоугольники (x, y, width, height) живых снарядов
+
+        alpha < 1 - позиция между прошлым и текущим тиком,
+        offset_x - сдвиг камеры (координаты экрана вместо мира)
+        """
+        slots = self.slots()
+        x = self.x[slots]
+        if alpha != 1.0:
+            x = x - self.speed[slots] * (1.0 - alpha)
+        if offset_x:
+            x = x - offset_x
+        return zip(x.tolist(), self.y[slots].tolist(),
+                   self.width[slots].tolist(), self.height[slots].tolist())
+
+    def collide(self, index, valid=None):
+        """Попадания снарядов в прямоугольники индекса SortedBoxes
+
+        valid - маска прямоугольников, в которые можно попасть (живые враги).
+        Возвращает пары (слот, индекс прямоугольника): каждый снаряд попадает
+        в прямоугольник с наименьшим индексом, каждый прямоугольник
+        поражается один раз; снаряды разбираются в порядке выстрелов.
+        """
+        slots = self.slots()
+        if slots.size == 0:
+            return []
+        # Координаты снарядов округляются как в pygame.Rect
+        rows, targets = index.query(np.trunc(self.x[slots]), np.trunc(self.y[slots]),
+                                    self.width[slots], self.height[slots])
+        if valid is not None:
+            keep = valid[targets]
+            rows, targets = rows[keep], targets[keep]
+        if rows.size == 0:
+            return []
+
+        # Разбор в порядке выстрелов, у снаряда - по возрастанию индекса цели
+        order = np.lexsort((targets, self.serial[slots[rows]]))
+        hits = []
+        done = set()
+        taken = set()
+        for row, target in zip(rows[order].tolist(), targets[order].tolist()):
+            if row not in done and target not in taken:
+                done.add(row)
+                taken.add(target)
+                hits.append((int(slots[row]), target))
+        return hits
+
+    def __len__(self):
+        return self.count
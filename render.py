@@ -0,0 +1,47 @@
+"""
+Пакетная отрисовка кадра
+"""
+
+import pygame
+
+
+class RenderBatch:
+    """Команды отрисовки кадра, сгруппированные по слоям
+
+    Команды копятся в течение кадра, а submit() выводит каждый слой
+    одним вызовом Surface.blits в порядке объявления слоев.
+    """
+    def __init__(self, layers):
+        self.layers = {layer: [] for layer in layers}
+        # Залитые поверхности для прямоугольников: (цвет, размер) -> Surface
+        self.fills = {}
+
+    def blit(self, layer, source, dest, area=None):
+        """Вывод source (или его области area) в точку dest"""
+        if area is None:
+            self.layers[layer].append((source, dest))
+        else:
+            self.layers[layer].append((source, dest, area))
+
+    def rect(self, layer, color, rect):
+        """Закрашенный прямоугольник (x, y, width, height)"""
+        x, y, width, height = rect
+        key = (color, int(width), int(height))
+        fill = self.fills.get(key)
+        if fill is None:
+            fill = pygame.Surface(key[1:])
+            fill.fill(color)
+            self.fills[key] = fill
+        self.layers[layer].append((fill, (x, y)))
+
+    def submit(self, screen):
+        """Вывод всех слоев; возвращает закрашенные прямоугольники"""
+        drawn = []
+        for commands in self.layers.values():
+            if commands:
+                drawn.extend(screen.blits(commands))
+                commands.clear()
+        return drawn
+
+    def __len__(self):
+        return sum(len(commands) for commands in self.layers.values())
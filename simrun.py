@@ -0,0 +1,238 @@
+"""
+Пакетные прогоны игры без окна на пуле процессов
+
+Каждый прогон - отдельная игра со своим зерном, стратегией ввода и
+переопределенными параметрами. Процесс-исполнитель возвращает только
+итоговую статистику прогона, по кадрам ничего не передается.
+
+    python simrun.py [--runs N] [--workers N] [--policy random|rush|idle]
+                     [--replay файл] [--level N] [--max-ticks N]
+                     [--set имя=значение ...] [--sweep имя=з1,з2,... ...]
+                     [--out файл.jsonl]
+
+Параметры: jump_power, speed, gravity (игрок), enemy_speed (множитель
+скорости врагов), lives (жизни на старте).
+"""
+
+from cli import headless, option, options
+
+headless()
+
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import pygame
+
+from game import Game
+from inputs import Recording, LEFT, RIGHT, SPACE, Z, N
+from sprites import LOAD_LAZY
+
+PLAYER_PARAMS = ("jump_power", "speed", "gravity")
+MAX_TICKS = 36000
+
+
+# Стратегии: (игра, генератор случайных чисел) -> маска клавиш на тик
+
+def policy_idle(game, rng):
+    """Стоит на месте"""
+    return 0
+
+
+def policy_random(game, rng):
+    """Случайные клавиши, удерживаемые случайное время"""
+    state = game.policy_state
+    if state.get("hold", 0) <= 0:
+        state["mask"] = rng.choice((0, LEFT, RIGHT, RIGHT | Z, LEFT | Z,
+                                    RIGHT | SPACE, LEFT | SPACE, Z, SPACE | Z))
+        state["hold"] = rng.randrange(5, 40)
+    state["hold"] -= 1
+    return state["mask"]
+
+
+def policy_rush(game, rng):
+    """Держит дистанцию до ближайшего врага и стреляет в его сторону"""
+    system = game.enemy_system
+    player = game.player
+    alive = system.alive.nonzero()[0]
+    if alive.size == 0:
+        return 0
+    target = alive[abs(system.x[alive] - player.x).argmin()]
+    dx = system.x[target] - player.x
+    toward = RIGHT if dx > 0 else LEFT
+    away = LEFT if dx > 0 else RIGHT
+    if abs(dx) > 250:
+        mask = toward
+    elif abs(dx) < 120:
+        mask = away
+    else:
+        # Разворот к цели коротким нажатием
+        mask = toward if game.tick_count % 8 == 0 else 0
+    # Выстрел через тик - нажатие засчитывается по фронту
+    if game.tick_count % 2:
+        mask |= Z
+    if abs(dx) < 90 or rng.random() < 0.02:
+        mask |= SPACE
+    return mask
+
+
+POLICIES = {"idle": policy_idle, "random": policy_random, "rush": policy_rush}
+
+
+class BatchGame(Game):
+    """Игра для пакетных прогонов: параметры применяются к каждому уровню"""
+    def __init__(self, overrides=None, **options):
+        self.overrides = overrides or {}
+        self.policy_state = {}
+        super().__init__(**options)
+
+    def load_level(self, level_number, path=None):
+        super().load_level(level_number, path)
+        for name in PLAYER_PARAMS:
+            if name in self.overrides:
+                setattr(self.player, name, self.overrides[name])
+        if "enemy_speed" in self.overrides:
+            self.enemy_system.speed *= self.overrides["enemy_speed"]
+
+
+def run_one(spec):
+    """Один прогон по описанию spec, возвращает итоговую статистику
+
+    spec: seed, policy (имя стратегии) или replay (путь к записи),
+    level, max_ticks, overrides.
+    """
+    seed = spec.get("seed", 0)
+    overrides = spec.get("overrides", {})
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = BatchGame(overrides, headless=True, render=False, sprite_loading=LOAD_LAZY)
+        max_ticks = spec.get("max_ticks", MAX_TICKS)
+        if spec.get("replay"):
+            # Запись воспроизводится как есть, вместе со своими нажатиями N
+            recording = Recording.load(spec["replay"])
+            game.play_recording(recording)
+            max_ticks = min(max_ticks, recording.ticks())
+            policy = None
+        else:
+            game.current_level = spec.get("level", 1)
+            game.lives = int(overrides.get("lives", game.lives))
+            game.load_level(game.current_level)
+            policy = POLICIES[spec.get("policy", "random")]
+        lives = game.lives
+
+        ticks = 0
+        while ticks < max_ticks and game.running and game.game_state != "game_over":
+            if policy is None:
+                mask = None
+            elif game.game_state == "level_complete":
+                mask = N
+            else:
+                mask = policy(game, rng)
+            game.tick(mask)
+            ticks += 1
+
+    return {
+        "seed": seed,
+        "policy": "replay" if policy is None else spec.get("policy", "random"),
+        "overrides": overrides,
+        "ticks": ticks,
+        "score": game.score,
+        "lives_lost": lives - max(game.lives, 0),
+        "level": game.current_level,
+        "won": not game.running,
+        "state": game.game_state,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def init_worker():
+    """Инициализация процесса-исполнителя"""
+    pygame.init()
+
+
+def run_batch(specs, workers=None, chunksize=None):
+    """Прогоны specs на пуле процессов; статистика в порядке завершения"""
+    workers = workers or os.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(specs) // (workers * 4))
+    if workers == 1:
+        init_worker()
+        yield from map(run_one, specs)
+        return
+    pool = multiprocessing.Pool(workers, initializer=init_worker)
+    try:
+        yield from pool.imap_unordered(run_one, specs, chunksize)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def parse_value(text):
+    """Число из строки параметра"""
+    return float(text) if "." in text else int(text)
+
+
+def main():
+    args = sys.argv[1:]
+    runs = int(option(args, "--runs")) if "--runs" in args else 100
+    workers = int(option(args, "--workers")) if "--workers" in args else None
+    base = {}
+    for item in options(args, "--set"):
+        name, value = item.split("=", 1)
+        base[name] = parse_value(value)
+    sweep = {}
+    for item in options(args, "--sweep"):
+        name, values = item.split("=", 1)
+        sweep[name] = [parse_value(value) for value in values.split(",")]
+
+    spec = {
+        "policy": option(args, "--policy") if "--policy" in args else "random",
+        "replay": option(args, "--replay") if "--replay" in args else None,
+        "level": int(option(args, "--level")) if "--level" in args else 1,
+        "max_ticks": int(option(args, "--max-ticks")) if "--max-ticks" in args else MAX_TICKS,
+    }
+    # Сетка значений --sweep, по runs прогонов на каждую точку
+    combos = [dict(base, **dict(zip(sweep, values)))
+              for values in itertools.product(*sweep.values())]
+    specs = [dict(spec, seed=seed, overrides=overrides)
+             for overrides in combos for seed in range(runs)]
+
+    out = open(option(args, "--out"), "w", encoding="utf-8") if "--out" in args else None
+    totals = {}
+    start = time.perf_counter()
+    ticks = 0
+    try:
+        for result in run_batch(specs, workers):
+            ticks += result["ticks"]
+            key = json.dumps(result["overrides"], sort_keys=True)
+            total = totals.setdefault(key, {"runs": 0, "won": 0, "score": 0, "level": 0})
+            total["runs"] += 1
+            total["won"] += result["won"]
+            total["score"] += result["score"]
+            total["level"] += result["level"]
+            if out is not None:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    for key, total in totals.items():
+        n = total["runs"]
+        print(f"{key}: побед {total['won'] / n:.1%}, средний счет {total['score'] / n:.0f}, "
+              f"средний уровень {total['level'] / n:.2f} ({n} прогонов)")
+    print(f"Прогонов: {len(specs)}, время: {elapsed:.1f} с, "
+          f"скорость: {ticks / elapsed:.0f} тиков/с")
+
+
+if __name__ == "__main__":
+    main()
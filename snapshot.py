@@ -0,0 +1,106 @@
+"""
+Снимки состояния симуляции: сохранение, загрузка и откат без перестройки уровня
+
+Снимок - bytes фиксированной раскладки: заголовок, поля игры, камеры,
+игрока и пула снарядов, затем массивы EnemySystem и пула как есть.
+Размер снимка зависит только от числа врагов уровня и емкости пула,
+а восстановление - копирование в уже существующие массивы, поэтому
+снимок можно делать каждый тик (перемотка, повторная симуляция).
+Платформы не меняются по ходу игры и в снимок не входят.
+"""
+
+import struct
+
+import numpy as np
+
+MAGIC = b"CDSS"
+VERSION = 2
+# Заголовок: магия, версия, уровень, число врагов, емкость пула снарядов
+HEADER = struct.Struct("<4sHHII")
+# Игра: счет, жизни, очки уровня, тик, маска прошлого тика, состояние, идет ли игра
+# Камера: x, prev_x
+# Игрок: x, y, prev_x, prev_y, vx, vy, speed, jump_power, gravity,
+#        перезарядка, на земле, в прыжке, смотрит вправо, персонаж (rect - по x, y)
+# Пул снарядов: следующий номер выстрела, число снарядов
+STATE = struct.Struct("<qiqqBBB" "ii" "9d" "i4B" "qi")
+
+GAME_STATES = ("menu", "playing", "paused", "game_over", "level_complete")
+CHARACTERS = ("Чип", "Дейл")
+ENEMY_ARRAYS = ("x", "y", "prev_x", "prev_y", "speed", "direction", "timer", "alive", "awake")
+PROJECTILE_ARRAYS = ("x", "y", "width", "height", "speed", "alive", "serial")
+FREE_SLOT = np.dtype("<i4")
+
+
+def arrays(game):
+    """Массивы снимка в порядке раскладки"""
+    system = game.enemy_system
+    pool = game.player.projectiles
+    return ([getattr(system, name) for name in ENEMY_ARRAYS]
+            + [getattr(pool, name) for name in PROJECTILE_ARRAYS])
+
+
+def take_snapshot(game):
+    """Снимок текущего состояния игры"""
+    player = game.player
+    camera = game.camera
+    pool = player.projectiles
+    header = HEADER.pack(MAGIC, VERSION, game.current_level,
+                         len(game.enemy_system.x), pool.capacity)
+    state = STATE.pack(
+        game.score, game.lives, game.level_score, game.tick_count, game.prev_mask,
+        GAME_STATES.index(game.game_state), game.running,
+        camera.x, camera.prev_x,
+        player.x, player.y, player.prev_x, player.prev_y, player.vx, player.vy,
+        player.speed, player.jump_power, player.gravity,
+        player.attack_cooldown,
+        player.on_ground, player.is_jumping, player.facing_right,
+        CHARACTERS.index(player.character),
+        pool.next_serial, pool.count)
+    # Стек свободных слотов дополняется до емкости пула
+    free = np.full(pool.capacity, -1, dtype=FREE_SLOT)
+    free[:len(pool.free)] = pool.free
+    return b"".join([header, state] + [array.tobytes() for array in arrays(game)]
+                    + [free.tobytes()])
+
+
+def restore_snapshot(game, data):
+    """Восстановление состояния из снимка
+
+    Уровень перестраивается, только если снимок сделан на другом уровне.
+    """
+    magic, version, level, enemy_count, capacity = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неизвестный формат снимка")
+    if level != game.current_level or game.level is None:
+        game.current_level = level
+        game.load_level(level)
+    pool = game.player.projectiles
+    if enemy_count != len(game.enemy_system.x) or capacity != pool.capacity:
+        raise ValueError("Снимок сделан на другом уровне")
+
+    player = game.player
+    camera = game.camera
+    (game.score, game.lives, game.level_score, game.tick_count, game.prev_mask,
+     state, running,
+     camera.x, camera.prev_x,
+     player.x, player.y, player.prev_x, player.prev_y, player.vx, player.vy,
+     player.speed, player.jump_power, player.gravity,
+     player.attack_cooldown,
+     on_ground, is_jumping, facing_right, character,
+     pool.next_serial, pool.count) = STATE.unpack_from(data, HEADER.size)
+    game.game_state = GAME_STATES[state]
+    game.running = bool(running)
+    player.on_ground = bool(on_ground)
+    player.is_jumping = bool(is_jumping)
+    player.facing_right = bool(facing_right)
+    player.character = CHARACTERS[character]
+
+    offset = HEADER.size + STATE.size
+    for array in arrays(game):
+        np.copyto(array, np.frombuffer(data, array.dtype, array.size, offset))
+        offset += array.nbytes
+    free = np.frombuffer(data, FREE_SLOT, capacity, offset)
+    pool.free = free[:capacity - pool.count].tolist()
+
+    # Кэш фона режима грязных прямоугольников мог устареть
+    game.background = None
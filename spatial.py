@@ -0,0 +1,131 @@
+"""
+Пространственные индексы для проверки столкновений
+"""
+
+import numpy as np
+import pygame
+
+# Размер ячейки сетки в пикселях
+CELL_SIZE = 128
+
+
+def cell_range(x, y, width, height, cell_size=CELL_SIZE):
+    """Диапазоны индексов ячеек, которые покрывает прямоугольник"""
+    x0 = int(x) // cell_size
+    y0 = int(y) // cell_size
+    x1 = (int(x) + max(int(width), 1) - 1) // cell_size
+    y1 = (int(y) + max(int(height), 1) - 1) // cell_size
+    return range(x0, x1 + 1), range(y0, y1 + 1)
+
+
+class PlatformGrid:
+    """Равномерная сетка статичных платформ уровня
+
+    Прямоугольники платформ создаются один раз при построении сетки.
+    Запрос возвращает только платформы из ячеек, которые пересекает
+    прямоугольник, в исходном порядке уровня.
+    """
+    def __init__(self, platforms=(), cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.rects = []
+        self.cells = {}
+        for platform in platforms:
+            self.add(platform)
+
+    def add(self, platform):
+        """Добавление платформы (x, y, width, height) в сетку"""
+        index = len(self.rects)
+        rect = pygame.Rect(platform)
+        self.rects.append(rect)
+
+        columns, rows = cell_range(*rect, self.cell_size)
+        for cx in columns:
+            for cy in rows:
+                self.cells.setdefault((cx, cy), []).append(index)
+
+    def query(self, rect):
+        """Платформы, ячейки которых пересекает прямоугольник"""
+        columns, rows = cell_range(*rect, self.cell_size)
+        cells = self.cells
+
+        # Частый случай - прямоугольник целиком в одной ячейке
+        if len(columns) == 1 and len(rows) == 1:
+            indices = cells.get((columns[0], rows[0]), ())
+        else:
+            found = set()
+            for cx in columns:
+                for cy in rows:
+                    found.update(cells.get((cx, cy), ()))
+            indices = sorted(found)
+
+        rects = self.rects
+        return [rects[i] for i in indices]
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __iter__(self):
+        return iter(self.rects)
+
+
+# До скольких пар (запрос, прямоугольник) SortedBoxes.query проверяет все пары
+DENSE_PAIRS = 4096
+
+
+class SortedBoxes:
+    """Прямоугольники, отсортированные по левому краю (sweep and prune)
+
+    Запрос бинарным поиском находит полосу прямоугольников, левый край
+    которых может попасть в x-диапазон запрашиваемого прямоугольника,
+    и точно проверяет только их. order - порядок с прошлого кадра:
+    почти отсортированный массив досортировывается за линейное время.
+    max_width - верхняя граница ширины прямоугольников.
+    """
+    def __init__(self, x, y, width, height, max_width, order=None):
+        if order is None or len(order) != len(x):
+            order = np.arange(len(x))
+        order = order[np.argsort(x[order], kind="stable")]
+        self.order = order
+        self.left = x[order]
+        self.top = y[order]
+        self.right = self.left + width[order]
+        self.bottom = self.top + height[order]
+        self.max_width = max_width
+
+    def query_rect(self, x, y, width, height):
+        """Индексы прямоугольников, пересекающих один прямоугольник"""
+        # Пересечь x-диапазон может только прямоугольник с левым краем
+        # в (x - max_width, x + width)
+        start = self.left.searchsorted(x - self.max_width, "right")
+        end = self.left.searchsorted(x + width, "left")
+        band = slice(start, end)
+        hit = (x < self.right[band]) & (self.top[band] < y + height) & (y < self.bottom[band])
+        return self.order[band][hit]
+
+    def query(self, x, y, width, height):
+        """Пересечения с прямоугольниками из массивов x, y, width, height
+
+        Возвращает массивы (индекс запроса, индекс прямоугольника).
+        На малых наборах полный перебор пар дешевле разметки полос.
+        """
+        if len(x) * len(self.left) <= DENSE_PAIRS:
+            hit = ((self.left < (x + width)[:, None]) & (x[:, None] < self.right) &
+                   (self.top < (y + height)[:, None]) & (y[:, None] < self.bottom))
+            rows, band = np.nonzero(hit)
+            return rows, self.order[band]
+
+        start = self.left.searchsorted(x - self.max_width, "right")
+        end = self.left.searchsorted(x + width, "left")
+        counts = np.maximum(end - start, 0)
+        total = int(counts.sum())
+        if not total:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty
+
+        # Позиции в отсортированном порядке для всех полос подряд
+        rows = np.repeat(np.arange(len(x)), counts)
+        first = np.cumsum(counts) - counts
+        band = np.arange(total) + np.repeat(start - first, counts)
+        hit = ((self.left[band] < (x + width)[rows]) & (x[rows] < self.right[band]) &
+               (self.top[band] < (y + height)[rows]) & (y[rows] < self.bottom[band]))
+        return rows[hit], self.order[band[hit]]
@@ -4,62 +4,109 @@
 
 import pygame
 import os
+from collections import OrderedDict
+from concurrent import futures
+from asset_pack import AssetPack, PACK_PATH
+from tracing import span
+
+# Пути к спрайтам
+SPRITE_PATHS = {
+    'chip': 'assets/sprites/chip.png',
+    'dale': 'assets/sprites/dale.png',
+    'rat': 'assets/sprites/rat.png',
+    'bee': 'assets/sprites/bee.png',
+    'fatcat': 'assets/sprites/fatcat.png'
+}
+
+# Ширина атласа спрайтов
+ATLAS_WIDTH = 512
+
+# Режимы загрузки: все сразу, в фоновых потоках, по первому запросу
+LOAD_SYNC = "sync"
+LOAD_BACKGROUND = "background"
+LOAD_LAZY = "lazy"
+
+
+def sprite_size(name):
+    """Размер, к которому масштабируется спрайт"""
+    if name in ['chip', 'dale']:
+        # Персонажи: 40x60
+        return (40, 60)
+    if name == 'fatcat':
+        # Босс: 60x60
+        return (60, 60)
+    # Обычные враги: 40x40
+    return (40, 40)
+
+
+def decode_sprite(path, size):
+    """Чтение PNG и масштабирование (не требует окна, годится для потока)"""
+    with span("decode_sprite", "sprites", {"path": path}):
+        image = pygame.image.load(path)
+        # Масштабируем только если размер не совпадает
+        if image.get_size() != size:
+            image = pygame.transform.scale(image, size)
+        return image
+
 
 class SpriteManager:
-    def __init__(self):
+    def __init__(self, max_variants=None, workers=4):
         self.sprites = {}
         self.loaded = False
 
-    def load_sprites(self):
-        """Загрузка всех спрайтов"""
-        try:
-            # Пути к спрайтам
-            sprite_paths = {
-                'chip': 'assets/sprites/chip.png',
-                'dale': 'assets/sprites/dale.png',
-                'rat': 'assets/sprites/rat.png',
-                'bee': 'assets/sprites/bee.png',
-                'fatcat': 'assets/sprites/fatcat.png'
-            }
+        # Кэш преобразованных вариантов: (имя, размер, flip_x, flip_y) -> Surface
+        # max_variants - предел размера кэша с вытеснением по LRU (None - без предела)
+        self.variants = OrderedDict()
+        self.max_variants = max_variants
+        self.variant_hits = 0
+        self.variant_misses = 0
+
+        # Фоновая загрузка: спрайты, ожидающие загрузки, и задачи пула
+        self.mode = LOAD_SYNC
+        self.paths = {}
+        self.pending = {}
+        self.workers = workers
+        self.executor = None
+        # Пакет готовых спрайтов (asset_pack.py), если собран
+        self.pack = None
+
+        # Атлас: все спрайты и их отраженные варианты на одной поверхности,
+        # (имя, размер, flip_x) -> область атласа. Пересобирается при
+        # замене спрайта или запросе нового варианта
+        self.atlas = None
+        self.atlas_regions = {}
+        self.atlas_keys = set()
+        self.atlas_dirty = True
 
+    def load_sprites(self, mode=LOAD_SYNC):
+        """Загрузка всех спрайтов
+
+        LOAD_SYNC - все спрайты читаются сразу; LOAD_BACKGROUND - чтение
+        в пуле потоков, до готовности рисуются заглушки (нужен вызов
+        poll() каждый кадр); LOAD_LAZY - спрайт читается при первом запросе
+        """
+        self.mode = mode
+        self.paths = dict(SPRITE_PATHS)
+        with span("load_pack", "sprites"):
+            self.load_pack()
+
+        if mode == LOAD_BACKGROUND:
+            if self.executor is None:
+                self.executor = futures.ThreadPoolExecutor(self.workers, "sprites")
+            for name, path in self.paths.items():
+                self.pending[name] = self.executor.submit(decode_sprite, path, sprite_size(name))
+            self.paths.clear()
+            self.loaded = True
+            return
+
+        if mode == LOAD_LAZY:
+            self.loaded = True
+            return
+
+        try:
             # Загрузка каждого спрайта
-            for name, path in sprite_paths.items():
-                try:
-                    if os.path.exists(path):
-                        image = pygame.image.load(path)
-                        # Преобразуем в правильный формат
-                        if image.get_alpha() is None:
-                            image = image.convert()
-                        else:
-                            image = image.convert_alpha()
-
-                        # Сохраняем оригинальный размер
-                        original_size = image.get_size()
-
-                        # Масштабируем спрайты до нужного размера
-                        if name in ['chip', 'dale']:
-                            # Персонажи: 40x60
-                            scaled_size = (40, 60)
-                        elif name == 'fatcat':
-                            # Босс: 60x60
-                            scaled_size = (60, 60)
-                        else:
-                            # Обычные враги: 40x40
-                            scaled_size = (40, 40)
-
-                        # Масштабируем только если размер не совпадает
-                        if original_size != scaled_size:
-                            image = pygame.transform.scale(image, scaled_size)
-
-                        self.sprites[name] = image
-                        print(f"✓ Загружен спрайт: {name}")
-                    else:
-                        print(f"⚠ Файл не найден: {path}, использую fallback")
-                        self.create_fallback_sprite(name)
-
-                except Exception as e:
-                    print(f"❌ Ошибка загрузки {name}: {e}")
-                    self.create_fallback_sprite(name)
+            for name in list(self.paths):
+                self.load_sprite(name)
 
             self.loaded = True
             print("✅ Все спрайты загружены!")
@@ -69,6 +116,75 @@ class SpriteManager:
             self.create_all_fallback_sprites()
             self.loaded = True
 
+    def load_pack(self, path=PACK_PATH):
+        """Спрайты из пакета; устаревшие и отсутствующие грузятся из PNG"""
+        if not os.path.exists(path):
+            return
+        try:
+            self.pack = AssetPack(path)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Не удалось открыть пакет спрайтов {path}: {e}")
+            return
+
+        for name in list(self.paths):
+            if self.pack.is_fresh(name, self.paths[name]):
+                # Поверхность ссылается на страницы файла и не конвертируется,
+                # чтобы не копировать пиксели
+                self.set_sprite(name, self.pack.surface(name))
+                del self.paths[name]
+        print(f"✓ Спрайтов из пакета: {len(SPRITE_PATHS) - len(self.paths)}")
+
+    def load_sprite(self, name):
+        """Синхронная загрузка одного спрайта"""
+        path = self.paths.pop(name)
+        try:
+            if os.path.exists(path):
+                self.finish_sprite(name, decode_sprite(path, sprite_size(name)))
+            else:
+                print(f"⚠ Файл не найден: {path}, использую fallback")
+                self.create_fallback_sprite(name)
+
+        except Exception as e:
+            print(f"❌ Ошибка загрузки {name}: {e}")
+            self.create_fallback_sprite(name)
+
+    def finish_sprite(self, name, image):
+        """Преобразование в формат экрана (только в главном потоке)"""
+        if pygame.display.get_surface() is not None:
+            with span("convert_sprite", "sprites", {"name": name}):
+                if image.get_alpha() is None:
+                    image = image.convert()
+                else:
+                    image = image.convert_alpha()
+        self.set_sprite(name, image)
+        print(f"✓ Загружен спрайт: {name}")
+
+    def poll(self):
+        """Прием спрайтов, прочитанных в фоне; True если что-то пришло"""
+        if not self.pending:
+            return False
+        done = [name for name, future in self.pending.items() if future.done()]
+        for name in done:
+            future = self.pending.pop(name)
+            try:
+                self.finish_sprite(name, future.result())
+            except Exception as e:
+                if isinstance(e, FileNotFoundError):
+                    print(f"⚠ Файл не найден: {SPRITE_PATHS.get(name, name)}, использую fallback")
+                else:
+                    print(f"❌ Ошибка загрузки {name}: {e}")
+                # Заглушка могла появиться раньше, по первому запросу
+                if name not in self.sprites:
+                    self.create_fallback_sprite(name)
+        if done and not self.pending:
+            print("✅ Все спрайты загружены!")
+        return bool(done)
+
+    def wait(self):
+        """Ожидание всех фоновых загрузок"""
+        futures.wait(list(self.pending.values()))
+        self.poll()
+
     def create_fallback_sprite(self, name):
         """Создание fallback спрайта если файл не найден"""
         print(f"Создаю fallback спрайт для {name}")
@@ -162,23 +278,133 @@ class SpriteManager:
             pygame.draw.rect(surface, (0, 0, 0), (12, 12, 4, 4))
             pygame.draw.rect(surface, (0, 0, 0), (24, 12, 4, 4))
 
-        self.sprites[name] = surface
+        self.set_sprite(name, surface)
 
     def create_all_fallback_sprites(self):
         """Создание всех fallback спрайтов"""
         for name in ['chip', 'dale', 'rat', 'bee', 'fatcat']:
             self.create_fallback_sprite(name)
 
+    def set_sprite(self, name, surface):
+        """Замена спрайта со сбросом его вариантов в кэше"""
+        self.sprites[name] = surface
+        self.clear_variants(name)
+        self.atlas_dirty = True
+
     def get_sprite(self, name):
-        """Получение спрайта по имени"""
-        return self.sprites.get(name)
+        """Получение спрайта по имени
+
+        Еще не прочитанный спрайт в режиме LOAD_LAZY загружается сразу,
+        в режиме LOAD_BACKGROUND на время загрузки выдается заглушка
+        """
+        sprite = self.sprites.get(name)
+        if sprite is None:
+            if name in self.paths:
+                self.load_sprite(name)
+            elif name in self.pending:
+                self.create_fallback_sprite(name)
+            sprite = self.sprites.get(name)
+        return sprite
+
+    def get_variant(self, name, size=None, flip_x=False, flip_y=False):
+        """Получение масштабированного и/или отраженного спрайта из кэша"""
+        sprite = self.get_sprite(name)
+        if sprite is None:
+            return None
+
+        size = sprite.get_size() if size is None else tuple(size)
+        if size == sprite.get_size() and not flip_x and not flip_y:
+            return sprite
+
+        key = (name, size, flip_x, flip_y)
+        variant = self.variants.get(key)
+        if variant is not None:
+            self.variant_hits += 1
+            if self.max_variants is not None:
+                self.variants.move_to_end(key)
+            return variant
+
+        # Промах - преобразуем один раз и запоминаем
+        self.variant_misses += 1
+        variant = sprite
+        if size != sprite.get_size():
+            variant = pygame.transform.scale(variant, size)
+        if flip_x or flip_y:
+            variant = pygame.transform.flip(variant, flip_x, flip_y)
+
+        self.variants[key] = variant
+        if self.max_variants is not None and len(self.variants) > self.max_variants:
+            self.variants.popitem(last=False)
+        return variant
 
     def get_flipped_sprite(self, name, flip_x=False, flip_y=False):
         """Получение отраженного спрайта"""
+        return self.get_variant(name, None, flip_x, flip_y)
+
+    def atlas_region(self, name, size=None, flip_x=False):
+        """Атлас и область спрайта в нем: (Surface, Rect) или None"""
         sprite = self.get_sprite(name)
-        if sprite:
-            return pygame.transform.flip(sprite, flip_x, flip_y)
-        return None
+        if sprite is None:
+            return None
+
+        key = (name, sprite.get_size() if size is None else tuple(size), flip_x)
+        region = self.atlas_regions.get(key)
+        if region is None or self.atlas_dirty:
+            self.atlas_keys.add(key)
+            with span("build_atlas", "sprites"):
+                self.build_atlas()
+            region = self.atlas_regions[key]
+        return self.atlas, region
+
+    def build_atlas(self):
+        """Укладка спрайтов в атлас полками (по убыванию высоты)"""
+        keys = set(self.atlas_keys)
+        for name, sprite in self.sprites.items():
+            keys.add((name, sprite.get_size(), False))
+            keys.add((name, sprite.get_size(), True))
+        keys = {key for key in keys if key[0] in self.sprites}
+
+        entries = [(key, self.get_variant(key[0], key[1], key[2])) for key in keys]
+        entries.sort(key=lambda entry: (-entry[1].get_height(), entry[0]))
+
+        self.atlas_regions = {}
+        x = y = shelf = 0
+        for key, surface in entries:
+            width, height = surface.get_size()
+            if x + width > ATLAS_WIDTH and x > 0:
+                # Новая полка
+                y += shelf
+                x = shelf = 0
+            self.atlas_regions[key] = pygame.Rect(x, y, width, height)
+            x += width
+            shelf = max(shelf, height)
+
+        atlas = pygame.Surface((ATLAS_WIDTH, max(1, y + shelf)), pygame.SRCALPHA)
+        # Сложение с прозрачным фоном копирует пиксели вместе с альфой как есть
+        for key, surface in entries:
+            atlas.blit(surface, self.atlas_regions[key], special_flags=pygame.BLEND_RGBA_ADD)
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+
+        self.atlas = atlas
+        self.atlas_keys = keys
+        self.atlas_dirty = False
+
+    def clear_variants(self, name=None):
+        """Сброс кэша вариантов (всех или одного спрайта)"""
+        if name is None:
+            self.variants.clear()
+            return
+        for key in [key for key in self.variants if key[0] == name]:
+            del self.variants[key]
+
+    def variant_stats(self):
+        """Статистика кэша вариантов"""
+        return {
+            'size': len(self.variants),
+            'hits': self.variant_hits,
+            'misses': self.variant_misses,
+        }
 
 # Глобальный экземпляр менеджера спрайтов
 sprite_manager = SpriteManager()
\ No newline at end of file
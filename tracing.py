@@ -0,0 +1,136 @@
+"""
+Трассировка: подписчики на начало и конец участков работы (span)
+
+Игра размечает участки через span(); пока подписчиков нет, span()
+возвращает пустой контекст и ничего не замеряет. Подписчик - объект
+с методами begin(name, category, args, ts) и end(name, category, ts),
+ts - perf_counter_ns(). Методы вызываются из того потока, где идет
+участок (загрузка спрайтов идет в фоновых потоках).
+
+ChromeTraceExporter пишет события в JSON формата Chrome trace event,
+который открывают chrome://tracing и ui.perfetto.dev.
+"""
+
+import gc
+import json
+import os
+import threading
+from time import perf_counter_ns
+
+subscribers = []
+
+
+class NullSpan:
+    """Пустой участок - когда подписчиков нет"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Участок, о начале и конце которого сообщается подписчикам"""
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        ts = perf_counter_ns()
+        for subscriber in subscribers:
+            subscriber.begin(self.name, self.category, self.args, ts)
+        return self
+
+    def __exit__(self, *exc):
+        ts = perf_counter_ns()
+        for subscriber in reversed(subscribers):
+            subscriber.end(self.name, self.category, ts)
+        return False
+
+
+def span(name, category="game", args=None):
+    """Контекст участка name; без подписчиков - NULL_SPAN"""
+    if not subscribers:
+        return NULL_SPAN
+    return Span(name, category, args)
+
+
+def subscribe(subscriber):
+    """Подключение подписчика"""
+    if subscriber not in subscribers:
+        subscribers.append(subscriber)
+
+
+def unsubscribe(subscriber):
+    """Отключение подписчика"""
+    if subscriber in subscribers:
+        subscribers.remove(subscriber)
+
+
+class ChromeTraceExporter:
+    """Подписчик, собирающий события для Chrome/Perfetto
+
+    gc_events=True - сборки мусора тоже попадают в трассу участками "gc".
+    """
+    def __init__(self, gc_events=True):
+        self.events = []
+        self.gc_events = gc_events
+        self.pid = os.getpid()
+        self.start = perf_counter_ns()
+        # Сборка мусора может начаться внутри event() - блокировка реентерабельная
+        self.lock = threading.RLock()
+        self.threads = {}
+
+    def attach(self):
+        """Подписка на участки игры (и сборки мусора)"""
+        subscribe(self)
+        if self.gc_events and self.on_gc not in gc.callbacks:
+            gc.callbacks.append(self.on_gc)
+        return self
+
+    def detach(self):
+        """Отписка"""
+        unsubscribe(self)
+        if self.on_gc in gc.callbacks:
+            gc.callbacks.remove(self.on_gc)
+
+    def event(self, phase, name, category, ts, args=None):
+        """Запись события; ts переводится в микросекунды от старта"""
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": phase,
+                 "ts": (ts - self.start) / 1000, "pid": self.pid,
+                 "tid": thread.ident}
+        self.threads[thread.ident] = thread.name
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def begin(self, name, category, args, ts):
+        self.event("B", name, category, ts, args)
+
+    def end(self, name, category, ts):
+        self.event("E", name, category, ts)
+
+    def on_gc(self, phase, info):
+        """Обработчик gc.callbacks"""
+        if phase == "start":
+            self.event("B", "gc", "gc", perf_counter_ns(), {"generation": info["generation"]})
+        else:
+            self.event("E", "gc", "gc", perf_counter_ns(),
+                       {"collected": info["collected"], "uncollectable": info["uncollectable"]})
+
+    def save(self, path):
+        """Запись трассы в JSON"""
+        with self.lock:
+            events = list(self.events)
+        # Имена потоков для просмотрщика
+        events.extend({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                       "args": {"name": name}} for tid, name in self.threads.items())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"📈 Трасса записана: {path} ({len(events)} событий)")
@@ -0,0 +1,98 @@
+"""
+Элементы интерфейса: кэш текста, виджеты HUD и экраны-заставки
+"""
+
+import pygame
+from collections import OrderedDict
+
+
+class TextCache:
+    """Кэш отрендеренных строк
+
+    Ключ - (шрифт, текст, цвет, сглаживание). При переполнении
+    вытесняется строка, которая дольше всех не запрашивалась.
+    """
+    def __init__(self, max_size=256):
+        self.surfaces = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Поверхность со строкой, из кэша или отрендеренная заново"""
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Очистка кэша"""
+        self.surfaces.clear()
+
+
+class HudText:
+    """Строка HUD, привязанная к значению
+
+    Текст перерисовывается только когда set() получает новое значение.
+    align="right" - x в позиции задает правый край строки.
+    """
+    def __init__(self, cache, font, template, position, color, align="left"):
+        self.cache = cache
+        self.font = font
+        self.template = template
+        self.position = position
+        self.color = color
+        self.align = align
+        self.value = None
+        self.surface = None
+
+    def set(self, value):
+        """Привязка значения, возвращает True если текст изменился"""
+        if self.surface is not None and value == self.value:
+            return False
+        self.value = value
+        self.surface = self.cache.render(self.font, self.template.format(value), self.color)
+        return True
+
+    def draw(self, surface):
+        """Отрисовка строки, возвращает закрашенный прямоугольник"""
+        x, y = self.position
+        if self.align == "right":
+            x -= self.surface.get_width()
+        return surface.blit(self.surface, (x, y))
+
+
+class OverlayScreen:
+    """Готовый кадр экрана-заставки (меню, пауза, конец игры и т.п.)
+
+    Кадр рисуется функцией compose(surface) в одну и ту же поверхность
+    и пересобирается только при смене ключа - значений его
+    динамических полей (очки, номер уровня).
+    """
+    def __init__(self, size, compose):
+        self.size = size
+        self.compose = compose
+        self.surface = None
+        self.key = None
+
+    def get(self, key):
+        """Кадр для текущих значений динамических полей"""
+        if self.surface is None:
+            self.surface = pygame.Surface(self.size)
+            if pygame.display.get_surface():
+                self.surface = self.surface.convert()
+        elif key == self.key:
+            return self.surface
+
+        self.compose(self.surface)
+        self.key = key
+        return self.surface